@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+bench_robust_read_csv.py
+Benchmark de robust_read_csv sobre un archivo sintético grande.
+
+Genera (una sola vez) un CSV de N filas con fecha, una columna europea
+(1.234,56) y una columna US (1234.56), y mide la lectura con la
+normalización por columna. Compara contra la normalización anterior
+(astype(str) + dos str.replace + to_numeric en todas las columnas).
+
+Uso:
+    python benchmarks/bench_robust_read_csv.py --rows 10000000
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path.append(str(ROOT_DIR))
+
+from src.estimation_script import robust_read_csv
+
+
+def make_file(path: Path, rows: int, chunk: int = 1_000_000) -> None:
+    rng = np.random.default_rng(0)
+    with open(path, "w", encoding="utf-8") as fh:
+        fh.write("Date;EU;US\n")
+        start = pd.Timestamp("1990-01-01")
+        for lo in range(0, rows, chunk):
+            n = min(chunk, rows - lo)
+            dates = (start + pd.to_timedelta(np.arange(lo, lo + n) % 20000, unit="D")).strftime("%d/%m/%Y")
+            vals = rng.uniform(1, 100_000, n).round(2)
+            eu = pd.Series(vals).map("{:,.2f}".format).str.translate(str.maketrans(",.", ".,"))
+            us = pd.Series(vals).map("{:.2f}".format)
+            pd.DataFrame({"Date": dates, "EU": eu, "US": us}).to_csv(
+                fh, sep=";", header=False, index=False
+            )
+
+
+def legacy_normalize(path: Path) -> pd.DataFrame:
+    df = pd.read_csv(path, sep=";")
+    for col in df.columns:
+        if "date" in col.lower():
+            continue
+        ser = (
+            df[col].astype(str).str.strip()
+            .str.replace(".", "", regex=False)
+            .str.replace(",", ".", regex=False)
+        )
+        df[col] = pd.to_numeric(ser, errors="coerce")
+    return df
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=10_000_000)
+    parser.add_argument("--path", type=Path, default=Path("/tmp/bench_robust_read_csv.csv"))
+    args = parser.parse_args()
+
+    if not args.path.exists():
+        print(f"Generando {args.rows} filas en {args.path} ...")
+        make_file(args.path, args.rows)
+
+    t0 = time.perf_counter()
+    legacy = legacy_normalize(args.path)
+    t_legacy = time.perf_counter() - t0
+
+    # Sin report=True: tracemalloc añade sobrecoste y distorsiona el tiempo
+    df = robust_read_csv(args.path)
+    t_new = df.attrs["ingest_stats"]["seconds"]
+
+    # La normalización anterior destruye los decimales US (12.50 → 1250)
+    us_ok = np.allclose(df["US"].to_numpy()[:1000], legacy["EU"].to_numpy()[:1000])
+
+    print(f" Anterior:  {t_legacy:.2f}s")
+    print(f" Nueva:     {t_new:.2f}s  ({t_legacy / t_new:.1f}x)")
+    print(f" Columna US correcta: {us_ok}")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,24 +2,45 @@
 """
 estimation_script.py
 Procesa X.csv, Y.csv, Z.csv con diferentes formatos de fecha, delimitadores
-y formatos numéricos. Calcula:
+y formatos numéricos. Calcula los precios de equipos definidos como matriz
+de pesos en config/equipment_formulas.csv (ver src/formulas.py):
 
 Equipo 1 = 0.2 * X + 0.8 * Y
 Equipo 2 = (X + Y + Z) / 3
 
 Ahora organiza:
-- data/raw:         X.csv, Y.csv, Z.csv originales
-- data/cleaned:     __cleaned__X.csv, __cleaned__Y.csv, __cleaned__Z.csv
-- data/processed:   estimated_equipment_prices.csv, summary_estimates.csv
+- data/raw:         <entrada>.csv originales (una por columna de la config)
+- data/cleaned:     __cleaned__X.csv, __cleaned__Y.csv, __cleaned__Z.csv (con --write-cleaned)
+- data/processed:   estimated_equipment_prices.parquet, summary_estimates.parquet
+                    (+ .csv con --csv), pipeline_state.json (watermarks)
 - data/plots:       equipment_prices_plot.png
+
+Con --incremental solo se leen y procesan las fechas posteriores al
+último watermark de cada fuente.
 """
 
+import argparse
+import hashlib
+import io
+import json
+import re
+import shutil
+import sys
+import time
+import tracemalloc
 import pandas as pd
 from pathlib import Path
-import matplotlib.pyplot as plt
+from typing import Optional
 
 
 ROOT_DIR = Path(__file__).resolve().parent.parent
+if str(ROOT_DIR) not in sys.path:
+    sys.path.append(str(ROOT_DIR))
+
+from src.formulas import FORMULAS_PATH, drop_mask, evaluate_formulas, load_formulas
+from src.running_stats import RunningStats, stats_from_frame, summarize
+from src.storage import append_table, load_table, save_table, table_exists
+
 DATA_DIR = ROOT_DIR / "data"
 
 RAW_DIR = DATA_DIR / "raw"
@@ -38,50 +59,232 @@ for d in [RAW_DIR, CLEAN_DIR, PROCESSED_DIR, PLOTS_DIR]:
 # ---------------------------------------------------------------------------
 # Robust CSV Reader
 # ---------------------------------------------------------------------------
-def robust_read_csv(path: Path) -> pd.DataFrame:
+SAMPLE_BYTES = 64 * 1024
+CHUNK_ROWS = 250_000
+CANDIDATE_SEPS = [";", ",", "\t", "|"]
+DATE_KEYS = ["date", "fecha", "time"]
+
+# Patrones inequívocos de cada convención numérica
+_EU_VOTE = re.compile(r"^-?\d{1,3}(\.\d{3})+(,\d+)?$|^-?\d*,(\d{1,2}|\d{4,})$|^-?[\d.]*\.\d*,\d+$")
+_US_VOTE = re.compile(r"^-?\d{1,3}(,\d{3})+(\.\d+)?$|^-?\d*\.(\d{1,2}|\d{4,})$|^-?[\d,]*,\d*\.\d+$")
+
+def _is_date_col(col: str) -> bool:
+    return any(k in col.lower() for k in DATE_KEYS)
+
+
+def detect_number_format(values: pd.Series) -> str:
     """
-    Lector robusto:
-    - limpia BOM
-    - prueba múltiples delimitadores
-    - convierte comas decimales
-    - guarda copia limpia en data/cleaned/
+    Decide la convención de miles/decimales de una columna a partir de
+    una muestra de valores en texto:
+    - "eu": 1.234,5  (punto = miles, coma = decimal)
+    - "us": 1,234.5  (coma = miles, punto = decimal)
+    Los casos ambiguos (p. ej. "1.234") no votan; si no hay votos,
+    se asume "eu" solo cuando aparece alguna coma.
     """
-    raw = path.read_text(encoding="utf-8", errors="ignore").replace("\ufeff", "")
+    sample = values.dropna().astype(str).str.strip()
+    eu = int(sample.str.match(_EU_VOTE).sum())
+    us = int(sample.str.match(_US_VOTE).sum())
+    if eu != us:
+        return "eu" if eu > us else "us"
+    return "eu" if sample.str.contains(",", regex=False).any() else "us"
 
-    # Nuevo destino: carpeta cleaned
-    cleaned_path = CLEAN_DIR / f"__cleaned__{path.name}"
-    cleaned_path.write_text(raw, encoding="utf-8")
-
-    df = None
-    for sep in [None, ";", ",", "\t", "|"]:
-        try:
-            df = pd.read_csv(cleaned_path, sep=sep)
-            if not df.empty:
-                break
-        except Exception:
-            continue
-
-    if df is None or df.empty:
+
+def to_numeric_by_format(ser: pd.Series, fmt: str) -> pd.Series:
+    """
+    Convierte una columna de texto a número según su convención,
+    sin strip ni astype(str) previos (el parser ya entrega texto).
+    """
+    if pd.api.types.is_numeric_dtype(ser):
+        return ser
+    if fmt == "eu":
+        ser = ser.str.replace(".", "", regex=False).str.replace(",", ".", regex=False)
+    else:
+        ser = ser.str.replace(",", "", regex=False)
+    # Conversión estricta: lo inválido → NaN
+    return pd.to_numeric(ser, errors="coerce")
+
+
+def sniff_csv_format(path: Path, sample_bytes: int = SAMPLE_BYTES) -> dict:
+    """
+    Detecta delimitador y convención numérica por columna a partir de
+    una muestra de la cabecera del archivo (sin leerlo completo).
+    Si todas las columnas numéricas son europeas, devuelve también las
+    opciones nativas decimal/thousands del parser.
+    """
+    with open(path, "rb") as fh:
+        head = fh.read(sample_bytes)
+        truncated = bool(fh.read(1))
+
+    lines = head.decode("utf-8", errors="ignore").replace("\ufeff", "").splitlines()
+    if truncated and len(lines) > 1:
+        lines = lines[:-1]  # la última línea puede estar cortada
+    lines = [ln for ln in lines if ln.strip()]
+    if not lines:
         raise ValueError(f"No se pudo leer el archivo: {path}")
 
-    df.columns = [c.strip().replace("\ufeff", "") for c in df.columns]
+    # Delimitador: el que aparece el mismo número de veces (>0) en todas las líneas
+    sep = None
+    for cand in CANDIDATE_SEPS:
+        counts = {ln.count(cand) for ln in lines}
+        if len(counts) == 1 and counts.pop() > 0:
+            sep = cand
+            break
+    if sep is None:
+        sep = max(CANDIDATE_SEPS, key=lambda c: lines[0].count(c))
+        if lines[0].count(sep) == 0:
+            raise ValueError(f"No se pudo detectar el delimitador de: {path}")
+
+    # Convención numérica por columna sobre la muestra
+    sample = pd.read_csv(io.StringIO("\n".join(lines)), sep=sep, dtype=str)
+    formats = {
+        c.strip(): detect_number_format(sample[c])
+        for c in sample.columns
+        if not _is_date_col(c)
+    }
+
+    all_eu = bool(formats) and all(f == "eu" for f in formats.values())
+    return {
+        "sep": sep,
+        "columns": [c.strip() for c in sample.columns],
+        "raw_columns": list(sample.columns),
+        "formats": formats,
+        "decimal": "," if all_eu else ".",
+        "thousands": "." if all_eu else None,
+    }
 
-    # Normalización de números
-    for col in df.columns:
-      if any(k in col.lower() for k in ["date", "fecha", "time"]):
-          continue
 
-      ser = (
-          df[col]
-          .astype(str)
-          .str.strip()
-          .str.replace(".", "", regex=False)     # eliminar separador de miles europeo
-          .str.replace(",", ".", regex=False)    # convertir coma decimal
-      )
+def _write_cleaned_copy(path: Path) -> Path:
+    """Copia el archivo sin BOM a data/cleaned/ en streaming."""
+    cleaned_path = CLEAN_DIR / f"__cleaned__{path.name}"
+    with open(path, encoding="utf-8-sig", errors="ignore") as src, \
+            open(cleaned_path, "w", encoding="utf-8") as dst:
+        shutil.copyfileobj(src, dst)
+    return cleaned_path
+
+
+def _reaches(chunk: pd.DataFrame, stop_at: pd.Timestamp) -> bool:
+    for col in chunk.columns:
+        if _is_date_col(col):
+            dates = pd.to_datetime(chunk[col], errors="coerce", dayfirst=True)
+            return bool((dates <= stop_at).any())
+    return False
+
+
+def _read_chunks(
+    path: Path,
+    fmt: dict,
+    chunksize: int,
+    start_offset: int,
+    stop_at: Optional[pd.Timestamp] = None,
+) -> pd.DataFrame:
+    """
+    Parsea el archivo por bloques según el formato detectado. Con stop_at
+    deja de leer tras el primer bloque con alguna fecha <= stop_at.
+    """
+    header = None if start_offset else "infer"
+
+    # Las fechas siempre se leen como texto (con thousands="." nativo,
+    # "12.09.2023" se convertiría en el entero 12092023).
+    # Sin opciones nativas (archivo mixto), las columnas europeas también:
+    # así siempre pasan por to_numeric_by_format, sin importar qué valores
+    # caigan en cada bloque
+    names = fmt["columns"] if start_offset else fmt["raw_columns"]
+    text_cols = {c for c in fmt["columns"] if _is_date_col(c)}
+    if fmt["thousands"] is None:
+        text_cols |= {c for c in fmt["columns"] if fmt["formats"].get(c) == "eu"}
+    dtype = {raw: str for raw, col in zip(names, fmt["columns"]) if col in text_cols}
+
+    chunks = []
+    # El archivo se cierra aunque falle el constructor del lector
+    with open(path, "rb") as source:
+        source.seek(start_offset)
+        with pd.read_csv(
+            source,
+            sep=fmt["sep"],
+            decimal=fmt["decimal"],
+            thousands=fmt["thousands"],
+            dtype=dtype or None,
+            header=header,
+            names=fmt["columns"] if start_offset else None,
+            encoding="utf-8-sig",
+            encoding_errors="ignore",
+            chunksize=chunksize,
+        ) as reader:
+            for chunk in reader:
+                chunk.columns = [c.strip().replace("\ufeff", "") for c in chunk.columns]
+                for col in chunk.columns:
+                    # Columnas ya numéricas (parser nativo) no pasan por texto
+                    if _is_date_col(col) or pd.api.types.is_numeric_dtype(chunk[col]):
+                        continue
+                    chunk[col] = to_numeric_by_format(chunk[col], fmt["formats"].get(col, "us"))
+                chunks.append(chunk)
+                if stop_at is not None and _reaches(chunk, stop_at):
+                    break
+
+    if not chunks:
+        raise ValueError(f"No se pudo leer el archivo: {path}")
+    df = pd.concat(chunks, ignore_index=True) if len(chunks) > 1 else chunks[0]
+    if df.empty:
+        raise ValueError(f"No se pudo leer el archivo: {path}")
+    return df
 
-      # Conversión estricta: forzamos numérico, lo inválido → NaN
-      df[col] = pd.to_numeric(ser, errors="coerce")
 
+def robust_read_csv(
+    path: Path,
+    write_cleaned: bool = False,
+    chunksize: int = CHUNK_ROWS,
+    report: bool = False,
+    start_offset: int = 0,
+    stop_at: Optional[pd.Timestamp] = None,
+) -> pd.DataFrame:
+    """
+    Lector robusto en streaming:
+    - detecta delimitador y convención miles/decimal por columna con una
+      muestra de cabecera
+    - limpia BOM al vuelo
+    - parsea por bloques (chunks) a columnas numéricas tipadas
+    - guarda copia limpia en data/cleaned/ solo si write_cleaned=True
+    - con start_offset > 0 lee solo los bytes añadidos desde ese punto
+      (la cabecera se toma de la muestra inicial)
+    - con stop_at deja de leer en el primer bloque que llega a esa fecha
+      (archivos con las fechas más recientes primero)
+
+    Las métricas de ingesta (filas, MB/s, pico de memoria) quedan en
+    df.attrs["ingest_stats"] y se imprimen si report=True.
+    """
+    if report:
+        tracemalloc.start()
+    try:
+        t0 = time.perf_counter()
+        fmt = sniff_csv_format(path)
+        df = _read_chunks(path, fmt, chunksize, start_offset, stop_at)
+
+        if write_cleaned:
+            _write_cleaned_copy(path)
+
+        elapsed = time.perf_counter() - t0
+        # Solo los bytes leídos (desde start_offset), no el archivo completo
+        size_mb = (path.stat().st_size - start_offset) / 1e6
+        stats = {
+            "rows": len(df),
+            "seconds": elapsed,
+            "mb_per_s": size_mb / elapsed if elapsed > 0 else float("inf"),
+            "peak_mb": None,
+            **fmt,
+        }
+        if report:
+            stats["peak_mb"] = tracemalloc.get_traced_memory()[1] / 1e6
+    finally:
+        # También si la lectura falla: no dejar tracemalloc activo
+        if report:
+            tracemalloc.stop()
+
+    if report:
+        print(
+            f" Ingesta {path.name}: {stats['rows']} filas en {elapsed:.2f}s "
+            f"({stats['mb_per_s']:.1f} MB/s, pico {stats['peak_mb']:.1f} MB)"
+        )
+    df.attrs["ingest_stats"] = stats
 
     return df
 
@@ -98,7 +301,7 @@ def first_numeric_col(df: pd.DataFrame):
 
 def maybe_parse_date(df: pd.DataFrame):
     for c in df.columns:
-        if any(k in c.lower() for k in ["date", "fecha", "time"]):
+        if _is_date_col(c):
             df[c] = pd.to_datetime(df[c], errors="coerce", dayfirst=True)
             df = df.dropna(subset=[c])
             df = df.sort_values(c).set_index(c)
@@ -107,74 +310,317 @@ def maybe_parse_date(df: pd.DataFrame):
 
 
 # ---------------------------------------------------------------------------
-# MAIN PIPELINE
+# Estado incremental (watermarks + agregados)
 # ---------------------------------------------------------------------------
-def main():
-    # Archivos originales deben estar en data/raw/
-    paths = {
-        "X": RAW_DIR / "X.csv",
-        "Y": RAW_DIR / "Y.csv",
-        "Z": RAW_DIR / "Z.csv",
+STORE_STEM = PROCESSED_DIR / "estimated_equipment_prices"
+SUMMARY_STEM = PROCESSED_DIR / "summary_estimates"
+STATE_PATH = PROCESSED_DIR / "pipeline_state.json"
+TAIL_CHECK_BYTES = 4096
+HEAD_CHUNK_ROWS = 1_000
+
+
+def load_state() -> dict:
+    if not STATE_PATH.exists():
+        return {}
+    return json.loads(STATE_PATH.read_text(encoding="utf-8"))
+
+
+def save_state(state: dict) -> None:
+    STATE_PATH.write_text(json.dumps(state, indent=2), encoding="utf-8")
+
+
+def _tail_fingerprint(path: Path, offset: int) -> str:
+    """Hash de los últimos bytes antes de offset (detecta reescrituras)."""
+    start = max(0, offset - TAIL_CHECK_BYTES)
+    with open(path, "rb") as fh:
+        fh.seek(start)
+        return hashlib.sha1(fh.read(offset - start)).hexdigest()
+
+
+def _newest_first(path: Path) -> bool:
+    """True si el archivo lista primero las fechas más recientes (según sus primeras filas)."""
+    fmt = sniff_csv_format(path)
+    sample = pd.read_csv(
+        path, sep=fmt["sep"], dtype=str, nrows=HEAD_CHUNK_ROWS,
+        encoding="utf-8-sig", encoding_errors="ignore",
+    )
+    for col in sample.columns:
+        if _is_date_col(col.strip()):
+            dates = pd.to_datetime(sample[col], errors="coerce", dayfirst=True).dropna()
+            return len(dates) > 1 and dates.iloc[0] > dates.iloc[-1]
+    return False
+
+
+def _source_state(path: Path, last_date: pd.Timestamp) -> dict:
+    size = path.stat().st_size
+    return {
+        "last_date": last_date.isoformat(),
+        "offset": size,
+        "tail": _tail_fingerprint(path, size),
+        "newest_first": _newest_first(path),
     }
 
-    for name, p in paths.items():
-        if not p.exists():
-            raise FileNotFoundError(
-                f"No se encontró {name}.csv en {RAW_DIR}. Colócalo ahí."
-            )
 
-    # Leer y limpiar
-    X = robust_read_csv(paths["X"])
-    Y = robust_read_csv(paths["Y"])
-    Z = robust_read_csv(paths["Z"])
+def load_series(path: Path, name: str, start_offset: int = 0, **read_kwargs) -> pd.Series:
+    """Lee una fuente y devuelve su primera columna numérica indexada por fecha."""
+    df = maybe_parse_date(robust_read_csv(path, start_offset=start_offset, **read_kwargs))
+    return df[first_numeric_col(df)].rename(name)
 
-    X = maybe_parse_date(X)
-    Y = maybe_parse_date(Y)
-    Z = maybe_parse_date(Z)
 
-    x_col = first_numeric_col(X)
-    y_col = first_numeric_col(Y)
-    z_col = first_numeric_col(Z)
+def read_new_rows(path: Path, name: str, src_state: dict, **read_kwargs) -> tuple:
+    """
+    Devuelve (filas posteriores al watermark, estado nuevo de la fuente).
+    - Fechas ascendentes: si el archivo solo creció (los bytes previos no
+      cambiaron) se lee desde el último offset.
+    - Fechas descendentes (X.csv, Y.csv): las filas nuevas se anteponen,
+      así que los bytes finales no cambian; se lee desde la cabecera por
+      bloques pequeños hasta llegar al watermark.
+    - Si el archivo fue reescrito, se relee completo.
+    El estado (offset, hash final) se renueva siempre que se leyó el
+    archivo, haya o no fechas nuevas.
+    """
+    size = path.stat().st_size
+    offset = src_state["offset"]
+    last_date = pd.Timestamp(src_state["last_date"])
+    newest_first = src_state.get("newest_first", False)
+
+    # En un archivo descendente el final (fechas antiguas) no se mueve
+    tail_end = size if newest_first else offset
+    unchanged = size >= offset and _tail_fingerprint(path, tail_end) == src_state["tail"]
+
+    if unchanged and size == offset:
+        return pd.Series(dtype="float64", name=name, index=pd.DatetimeIndex([])), src_state
+    if unchanged and newest_first:
+        series = load_series(path, name, stop_at=last_date, chunksize=HEAD_CHUNK_ROWS, **read_kwargs)
+    elif unchanged:
+        series = load_series(path, name, start_offset=offset, **read_kwargs)
+    else:
+        series = load_series(path, name, **read_kwargs)
+
+    new = series[series.index > last_date]
+    return new, _source_state(path, max(last_date, new.index.max()) if not new.empty else last_date)
+
+
+# ---------------------------------------------------------------------------
+# MAIN PIPELINE
+# ---------------------------------------------------------------------------
+def compute_equipment(
+    combined: pd.DataFrame,
+    formulas: tuple,
+    last_inputs: Optional[pd.Series] = None,
+) -> pd.DataFrame:
+    """Añade una columna por equipo evaluando la matriz de pesos."""
+    weights, policies = formulas
+    equipment = evaluate_formulas(combined, weights, policies, last_inputs=last_inputs)
+    combined[list(equipment.columns)] = equipment.to_numpy()
+    return combined[drop_mask(equipment, policies)]
 
-    Xs = X[x_col].rename("X")
-    Ys = Y[y_col].rename("Y")
-    Zs = Z[z_col].rename("Z")
+
+def _formulas_fingerprint(formulas: tuple) -> str:
+    weights, policies = formulas
+    return hashlib.sha1(weights.join(policies).to_csv().encode("utf-8")).hexdigest()
+
+
+def _last_inputs(combined: pd.DataFrame, inputs: list) -> dict:
+    """Último valor conocido de cada entrada (para continuar un ffill)."""
+    last = combined[inputs].ffill().iloc[-1]
+    return {c: (None if pd.isna(v) else float(v)) for c, v in last.items()}
+
+
+def full_run(paths: dict, formulas: tuple, export_csv: bool = False, **read_kwargs) -> pd.DataFrame:
+    """Recalcula todo desde las fuentes y reinicia el estado incremental."""
+    series = {name: load_series(p, name, **read_kwargs) for name, p in paths.items()}
 
     # Combinar por índice si son fechas
     try:
-        combined = pd.concat([Xs, Ys, Zs], axis=1)
+        combined = pd.concat(series.values(), axis=1, sort=True)
     except Exception:
         combined = pd.DataFrame({
-            "X": Xs.reset_index(drop=True),
-            "Y": Ys.reset_index(drop=True),
-            "Z": Zs.reset_index(drop=True),
+            name: s.reset_index(drop=True) for name, s in series.items()
         })
 
     # Cálculos
-    combined["equip1"] = 0.2 * combined["X"] + 0.8 * combined["Y"]
-    combined["equip2"] = (combined["X"] + combined["Y"] + combined["Z"]) / 3.0
+    combined = compute_equipment(combined, formulas)
 
     summary = combined.describe()
 
     # Guardar outputs en carpetas organizadas
-    combined.to_csv(PROCESSED_DIR / "estimated_equipment_prices.csv")
-    summary.to_csv(PROCESSED_DIR / "summary_estimates.csv")
-
-    # Gráfica
-    plt.figure(figsize=(10, 5))
-    combined[["equip1", "equip2"]].plot(title="Estimated Equipment Base Prices")
-    plt.xlabel("Index (fecha o posición)")
-    plt.ylabel("Precio")
-    plt.tight_layout()
-    plt.savefig(PLOTS_DIR / "equipment_prices_plot.png")
-    plt.close()
+    save_table(combined, STORE_STEM, export_csv=export_csv)
+    save_table(summary, SUMMARY_STEM, export_csv=export_csv)
+
+    # Estado para ejecuciones incrementales (solo con índice de fechas)
+    if isinstance(combined.index, pd.DatetimeIndex):
+        save_state({
+            "sources": {
+                name: _source_state(paths[name], s.index.max()) for name, s in series.items()
+            },
+            "formulas": _formulas_fingerprint(formulas),
+            "last_inputs": _last_inputs(combined, list(paths)),
+            "index_name": combined.index.name,
+            "store_last_date": combined.index.max().isoformat(),
+            "stats": {c: s.to_dict() for c, s in stats_from_frame(combined).items()},
+        })
+    elif STATE_PATH.exists():
+        STATE_PATH.unlink()
+
+    return combined
+
+
+def incremental_run(
+    paths: dict,
+    state: dict,
+    formulas: tuple,
+    export_csv: bool = False,
+    **read_kwargs,
+) -> Optional[int]:
+    """
+    Procesa solo las fechas posteriores al watermark de cada fuente.
+    Las filas nuevas se añaden al almacén y el resumen se actualiza con
+    agregados incrementales. Devuelve el número de filas nuevas o
+    actualizadas, o None si hace falta un recálculo completo (fórmulas
+    cambiadas, fechas ya publicadas con políticas distintas de propagate,
+    cuyos valores dependen de filas vecinas, o fechas nuevas eliminadas
+    por la política drop).
+    """
+    weights, policies = formulas
+    if state.get("formulas") != _formulas_fingerprint(formulas):
+        return None
+
+    new, sources = {}, {}
+    for name, p in paths.items():
+        new[name], sources[name] = read_new_rows(p, name, state["sources"][name], **read_kwargs)
+    new_frame = pd.concat(new.values(), axis=1, sort=True)
+    if new_frame.empty:
+        # Un archivo reescrito sin fechas nuevas no debe releerse en cada ejecución
+        if sources != state["sources"]:
+            state["sources"] = sources
+            save_state(state)
+        return 0
+    new_frame.index.name = state["index_name"]
+
+    store_last = pd.Timestamp(state["store_last_date"])
+    only_appends = new_frame.index.min() > store_last
+
+    # Filas ya publicadas a las que llega el valor de una fuente atrasada
+    if only_appends:
+        store = None
+        old = pd.DataFrame(
+            index=new_frame.index,
+            columns=list(paths) + list(weights.index),
+            dtype="float64",
+        )
+    elif (policies != "propagate").any():
+        return None
+    else:
+        store = load_table(STORE_STEM)
+        old = store.reindex(new_frame.index)
+
+    last_inputs = pd.Series(state["last_inputs"], dtype="float64")
+    updated = compute_equipment(
+        old[list(paths)].combine_first(new_frame), formulas, last_inputs=last_inputs
+    )
+    if len(updated) < len(new_frame):
+        # Fechas eliminadas por la política drop: si avanzara el watermark
+        # se perderían cuando llegue la fuente atrasada
+        return None
+    old = old.loc[updated.index]
+
+    # Cada fuente solo aporta fechas nuevas: los valores pasan de NaN a número,
+    # así que los agregados solo necesitan sumar los valores recién válidos.
+    stats = {c: RunningStats.from_dict(d) for c, d in state["stats"].items()}
+    for col, s in stats.items():
+        s.update(updated.loc[old[col].isna(), col].to_numpy())
+
+    if only_appends:
+        append_table(updated, STORE_STEM, export_csv=export_csv)
+    else:
+        store = updated.combine_first(store).sort_index()
+        save_table(store, STORE_STEM, export_csv=export_csv)
+
+    save_table(summarize(stats), SUMMARY_STEM, export_csv=export_csv)
+
+    state["sources"] = sources
+    if only_appends:
+        state["last_inputs"] = _last_inputs(
+            pd.concat([last_inputs.to_frame().T, updated[list(paths)]]), list(paths)
+        )
+    state["store_last_date"] = max(store_last, updated.index.max()).isoformat()
+    state["stats"] = {c: s.to_dict() for c, s in stats.items()}
+    save_state(state)
+
+    return len(updated)
+
+
+def main(
+    write_cleaned: bool = False,
+    report: bool = False,
+    export_csv: bool = False,
+    incremental: bool = False,
+    formulas_path: Path = FORMULAS_PATH,
+    plot: bool = True,
+):
+    formulas = load_formulas(formulas_path)
+
+    # Archivos originales deben estar en data/raw/ (uno por entrada)
+    paths = {name: RAW_DIR / f"{name}.csv" for name in formulas[0].columns}
+
+    for name, p in paths.items():
+        if not p.exists():
+            raise FileNotFoundError(
+                f"No se encontró {name}.csv en {RAW_DIR}. Colócalo ahí."
+            )
+
+    read_kwargs = {"write_cleaned": write_cleaned, "report": report}
+    state = load_state() if incremental else {}
+
+    equipment = list(formulas[0].index)
+    n_rows = None
+    if state and table_exists(STORE_STEM):
+        n_rows = incremental_run(paths, state, formulas, export_csv=export_csv, **read_kwargs)
+
+    if n_rows is None:
+        combined = full_run(paths, formulas, export_csv=export_csv, **read_kwargs)
+    else:
+        print(f" Modo incremental: {n_rows} filas nuevas o actualizadas")
+        if n_rows == 0:
+            return
+        combined = load_table(STORE_STEM, columns=equipment)
+
+    # Gráfica (opcional; matplotlib solo se importa aquí)
+    if plot:
+        from src.plotting import plot_equipment_prices
+
+        plot_equipment_prices(combined[equipment], PLOTS_DIR / "equipment_prices_plot.png")
 
     print("\n=== OUTPUTS GENERADOS ===")
-    print(f" Limpios:      {CLEAN_DIR}")
+    if write_cleaned:
+        print(f" Limpios:      {CLEAN_DIR}")
     print(f" Procesados:   {PROCESSED_DIR}")
-    print(f" Gráficas:     {PLOTS_DIR}")
+    if plot:
+        print(f" Gráficas:     {PLOTS_DIR}")
     print("==========================\n")
 
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Estimación de precios base de equipos")
+    parser.add_argument("--write-cleaned", action="store_true",
+                        help="Guardar copia limpia de los CSV en data/cleaned/")
+    parser.add_argument("--report", action="store_true",
+                        help="Imprimir throughput y pico de memoria de la ingesta")
+    parser.add_argument("--csv", action="store_true",
+                        help="Exportar también los resultados en CSV")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Procesar solo las fechas nuevas desde la última ejecución")
+    parser.add_argument("--formulas", type=Path, default=FORMULAS_PATH,
+                        help="CSV con la matriz de pesos equipo × entrada")
+    parser.add_argument("--no-plot", action="store_true",
+                        help="No generar la gráfica (ver src/plotting.py)")
+    args = parser.parse_args()
+    main(
+        write_cleaned=args.write_cleaned,
+        report=args.report,
+        export_csv=args.csv,
+        incremental=args.incremental,
+        formulas_path=args.formulas,
+        plot=not args.no_plot,
+    )
@@ -1,3 +1,4 @@
+import sys
 import pandas as pd
 from prophet import Prophet
 from pathlib import Path
@@ -7,71 +8,113 @@ from pathlib import Path
 ROOT_DIR = Path(__file__).resolve().parent.parent
 DATA_DIR = ROOT_DIR / "data"
 PROCESSED_DIR = DATA_DIR / "processed"
+OUTPUT_FORECAST_DIR = PROCESSED_DIR / "forecast"
 
+if str(ROOT_DIR) not in sys.path:
+    sys.path.append(str(ROOT_DIR))
 
-# CARGA DEL DATASET PROCESADO
-FILE_PATH = PROCESSED_DIR / "estimated_equipment_prices.csv"
+from src.formulas import FORMULAS_PATH, load_formulas
+from src.storage import load_table, save_table, table_exists
 
-if not FILE_PATH.exists():
-    raise FileNotFoundError(
-        f"No se encontró el archivo estimado en: {FILE_PATH}\n"
-        f"Asegúrate de ejecutar primero estimation_script.py"
-    )
+# Archivo fuente
+FILE_STEM = PROCESSED_DIR / "estimated_equipment_prices"
 
-df = pd.read_csv(FILE_PATH, index_col=0)
+HORIZON_MONTHS = 36
 
 
-# CREACIÓN DEL ÍNDICE TEMPORAL PARA PROPHET
+def run_forecast(
+    export_csv: bool = False,
+    horizon_months: int = HORIZON_MONTHS,
+    formulas_path: Path = FORMULAS_PATH,
+) -> list:
+    """
+    Entrena un Prophet por equipo y exporta el forecast mensual.
+    Los equipos salen de formulas_path (el mismo archivo usado en la estimación).
+    """
 
-# Si el índice ya es datetime → usarlo
-if pd.api.types.is_datetime64_any_dtype(df.index):
-    ds_index = df.index
-else:
-    # Crear fechas diarias artificiales (MEJOR si tu serie no trae fechas)
-    ds_index = pd.date_range(
-        start=pd.Timestamp.today().normalize(),
-        periods=len(df),
-        freq="D"
-    )
+    # CARGA DEL DATASET PROCESADO (solo las columnas necesarias)
+    if not table_exists(FILE_STEM):
+        raise FileNotFoundError(
+            f"No se encontró el archivo estimado en: {FILE_STEM}.parquet\n"
+            f"Asegúrate de ejecutar primero estimation_script.py"
+        )
 
+    equipment = list(load_formulas(formulas_path)[0].index)
 
-# FORECASTING PARA EQUIP1 Y EQUIP2
-OUTPUT_FORECAST_DIR = PROCESSED_DIR / "forecast"
-OUTPUT_FORECAST_DIR.mkdir(parents=True, exist_ok=True)
+    df = load_table(FILE_STEM, columns=equipment)
+
+
+    # CREACIÓN DEL ÍNDICE TEMPORAL PARA PROPHET
+
+    # Si el índice ya es datetime → usarlo
+    if pd.api.types.is_datetime64_any_dtype(df.index):
+        ds_index = df.index
+    else:
+        # Crear fechas diarias artificiales (MEJOR si tu serie no trae fechas)
+        ds_index = pd.date_range(
+            start=pd.Timestamp.today().normalize(),
+            periods=len(df),
+            freq="D"
+        )
+
+
+    # FORECASTING POR EQUIPO
+    OUTPUT_FORECAST_DIR.mkdir(parents=True, exist_ok=True)
+
+    print("\n=== GENERANDO FORECAST PARA EQUIPOS ===\n")
+
+    outputs = []
+    for equip in equipment:
+        if equip not in df.columns:
+            print(f"Advertencia: {equip} no está en el dataframe. Se omite.")
+            continue
+
+        print(f"• Entrenando modelo Prophet para: {equip}")
+
+        # Prophet requiere columnas específicas: ds (fecha), y (valor)
+        temp = pd.DataFrame({
+            "ds": ds_index,
+            "y": df[equip].values
+        })
+
+        m = Prophet(
+            yearly_seasonality=True,
+            weekly_seasonality=False,
+            daily_seasonality=False
+        )
 
-print("\n=== GENERANDO FORECAST PARA EQUIPOS ===\n")
+        m.fit(temp)
 
-for equip in ["equip1", "equip2"]:
-    if equip not in df.columns:
-        print(f"Advertencia: {equip} no está en el dataframe. Se omite.")
-        continue
+        # Forecast 36 meses → frecuencia mensual
+        future = m.make_future_dataframe(periods=horizon_months, freq="M")
+        forecast = m.predict(future)
 
-    print(f"• Entrenando modelo Prophet para: {equip}")
+        # Exportar forecast
+        out_file = save_table(
+            forecast[["ds", "yhat", "yhat_lower", "yhat_upper"]],
+            OUTPUT_FORECAST_DIR / f"forecast_{equip}",
+            export_csv=export_csv,
+            index=False,
+        )
+        outputs.append(out_file)
 
-    # Prophet requiere columnas específicas: ds (fecha), y (valor)
-    temp = pd.DataFrame({
-        "ds": ds_index,
-        "y": df[equip].values
-    })
+        print(f"  Forecast generado → {out_file}")
 
-    m = Prophet(
-        yearly_seasonality=True,
-        weekly_seasonality=False,
-        daily_seasonality=False
-    )
 
-    m.fit(temp)
+    print("\n=== FORECAST COMPLETADO ===")
+    print(f"Archivos generados en: {OUTPUT_FORECAST_DIR}\n")
 
-    # Forecast 36 meses → frecuencia mensual
-    future = m.make_future_dataframe(periods=36, freq="M")
-    forecast = m.predict(future)
+    return outputs
 
-    # Exportar forecast
-    out_file = OUTPUT_FORECAST_DIR / f"forecast_{equip}.csv"
-    forecast[["ds", "yhat", "yhat_lower", "yhat_upper"]].to_csv(out_file, index=False)
 
-    print(f"  Forecast generado → {out_file}")
+if __name__ == "__main__":
+    import argparse
 
+    parser = argparse.ArgumentParser(description="Forecast a 36 meses por equipo")
+    parser.add_argument("--csv", action="store_true",
+                        help="Exportar también los resultados en CSV")
+    parser.add_argument("--formulas", type=Path, default=FORMULAS_PATH,
+                        help="Configuración de fórmulas usada en la estimación")
+    args = parser.parse_args()
 
-print("\n=== FORECAST COMPLETADO ===")
-print(f"Archivos generados en: {OUTPUT_FORECAST_DIR}\n")
+    run_forecast(export_csv=args.csv, formulas_path=args.formulas)
@@ -0,0 +1,105 @@
+"""
+formulas.py
+Motor de fórmulas de equipos configurable.
+
+Cada equipo es una fila de config/equipment_formulas.csv con un peso por
+serie de entrada (matriz equipo × entrada) y una política de faltantes:
+
+- propagate:    NaN si falta alguna entrada con peso != 0 (por defecto)
+- ffill:        las entradas se completan hacia adelante antes de evaluar
+- renormalize:  se usan las entradas disponibles, reescalando los pesos
+                para conservar su suma
+- drop:         las filas donde el equipo no se puede calcular se eliminan
+
+Todos los equipos con la misma política se evalúan con un único producto
+matricial sobre el DataFrame alineado de entradas.
+"""
+
+import numpy as np
+import pandas as pd
+from pathlib import Path
+from typing import Optional, Tuple
+
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+FORMULAS_PATH = ROOT_DIR / "config" / "equipment_formulas.csv"
+
+POLICIES = ["propagate", "ffill", "renormalize", "drop"]
+
+
+def load_formulas(path: Path = FORMULAS_PATH) -> Tuple[pd.DataFrame, pd.Series]:
+    """
+    Lee la configuración y devuelve (pesos, políticas):
+    - pesos:     DataFrame equipo × entrada (celdas vacías = 0)
+    - políticas: Series equipo → política de faltantes
+    """
+    cfg = pd.read_csv(path, index_col="equipment")
+    cfg.index = cfg.index.str.strip()
+    cfg.columns = [c.strip() for c in cfg.columns]
+
+    if "missing" in cfg.columns:
+        policies = cfg.pop("missing").fillna("propagate").str.strip().str.lower()
+    else:
+        policies = pd.Series("propagate", index=cfg.index)
+
+    unknown = sorted(set(policies) - set(POLICIES))
+    if unknown:
+        raise ValueError(f"Políticas de faltantes desconocidas en {path}: {unknown}")
+    if cfg.index.duplicated().any():
+        raise ValueError(f"Equipos duplicados en {path}")
+
+    weights = cfg.fillna(0.0).astype("float64")
+    return weights, policies.rename("missing")
+
+
+def evaluate_formulas(
+    inputs: pd.DataFrame,
+    weights: pd.DataFrame,
+    policies: pd.Series,
+    last_inputs: Optional[pd.Series] = None,
+) -> pd.DataFrame:
+    """
+    Evalúa todas las fórmulas sobre las entradas alineadas.
+    last_inputs (último valor conocido de cada entrada) permite continuar
+    un forward-fill en ejecuciones incrementales.
+    No elimina filas: la política drop se aplica con drop_mask().
+    """
+    inputs = inputs.reindex(columns=weights.columns)
+    W = weights.to_numpy()
+    out = np.empty((len(inputs), len(weights)))
+
+    for policy in policies.unique():
+        rows = (policies == policy).to_numpy()
+        frame = inputs
+        if policy == "ffill":
+            if last_inputs is not None:
+                seed = last_inputs.reindex(weights.columns).to_frame().T
+                frame = pd.concat([seed, frame]).ffill().iloc[1:]
+            else:
+                frame = frame.ffill()
+
+        A = frame.to_numpy(dtype="float64")
+        missing = np.isnan(A)
+        Wg = W[rows]
+
+        values = np.where(missing, 0.0, A) @ Wg.T
+        if policy == "renormalize":
+            available = (~missing).astype("float64") @ Wg.T
+            with np.errstate(divide="ignore", invalid="ignore"):
+                values = values * Wg.sum(axis=1) / available
+            values[available == 0] = np.nan
+        else:
+            used = (Wg != 0).astype("float64")
+            values[missing.astype("float64") @ used.T > 0] = np.nan
+
+        out[:, rows] = values
+
+    return pd.DataFrame(out, index=inputs.index, columns=weights.index)
+
+
+def drop_mask(equipment: pd.DataFrame, policies: pd.Series) -> np.ndarray:
+    """True en las filas que se conservan según la política drop."""
+    drop_cols = list(policies.index[policies == "drop"])
+    if not drop_cols:
+        return np.ones(len(equipment), dtype=bool)
+    return equipment[drop_cols].notna().all(axis=1).to_numpy()
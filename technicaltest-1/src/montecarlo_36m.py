@@ -1,3 +1,4 @@
+import sys
 import pandas as pd
 import numpy as np
 from pathlib import Path
@@ -11,74 +12,113 @@ DATA_DIR = ROOT_DIR / "data"
 PROCESSED_DIR = DATA_DIR / "processed"
 OUTPUT_MC_DIR = PROCESSED_DIR / "montecarlo"
 
-# Crear directorio si no existe
-OUTPUT_MC_DIR.mkdir(parents=True, exist_ok=True)
+if str(ROOT_DIR) not in sys.path:
+    sys.path.append(str(ROOT_DIR))
+
+from src.formulas import FORMULAS_PATH, load_formulas
+from src.storage import load_table, save_table, table_exists
 
 # Archivo fuente
-FILE_PATH = PROCESSED_DIR / "estimated_equipment_prices.csv"
+FILE_STEM = PROCESSED_DIR / "estimated_equipment_prices"
 
-if not FILE_PATH.exists():
-    raise FileNotFoundError(
-        f"No se encontró el archivo estimado en: {FILE_PATH}\n"
-        f"Asegúrate de ejecutar primero estimation_script.py"
-    )
+N_SIM = 10000
+HORIZON_MONTHS = 36
 
 
-# =============================================================================
-# CARGA DE DATOS
-# =============================================================================
-df = pd.read_csv(FILE_PATH, index_col=0)
+def run_montecarlo(
+    export_csv: bool = False,
+    n_sim: int = N_SIM,
+    horizon_months: int = HORIZON_MONTHS,
+    formulas_path: Path = FORMULAS_PATH,
+) -> dict:
+    """
+    Simula trayectorias de precio por equipo y exporta percentiles.
+    Los equipos salen de formulas_path (el mismo archivo usado en la estimación).
+    """
+
+    # Crear directorio si no existe
+    OUTPUT_MC_DIR.mkdir(parents=True, exist_ok=True)
+
+    if not table_exists(FILE_STEM):
+        raise FileNotFoundError(
+            f"No se encontró el archivo estimado en: {FILE_STEM}.parquet\n"
+            f"Asegúrate de ejecutar primero estimation_script.py"
+        )
+
+
+    # =========================================================================
+    # CARGA DE DATOS (solo las columnas necesarias)
+    # =========================================================================
+    equipment = list(load_formulas(formulas_path)[0].index)
+
+    df = load_table(FILE_STEM, columns=equipment)
+
+    results = {}
+
+    print("\n=== EJECUTANDO SIMULACIÓN MONTE CARLO ===\n")
+
+    for equip in equipment:
+
+        if equip not in df.columns:
+            print(f"Advertencia: {equip} no está en el dataframe. Se omite.")
+            continue
 
-n_sim = 10000
-horizon_months = 36
+        print(f"• Simulando: {equip}")
 
-results = {}
+        series = df[equip].dropna()
 
-print("\n=== EJECUTANDO SIMULACIÓN MONTE CARLO ===\n")
+        # Cálculo de retornos históricos
+        returns = series.pct_change().dropna()
 
-for equip in ["equip1", "equip2"]:
+        mu = returns.mean()        # retorno promedio
+        sigma = returns.std()      # volatilidad histórica
+        last = series.iloc[-1]     # último valor observable
 
-    if equip not in df.columns:
-        print(f"Advertencia: {equip} no está en el dataframe. Se omite.")
-        continue
+        sims = np.zeros((n_sim, horizon_months))
 
-    print(f"• Simulando: {equip}")
+        for i in range(n_sim):
+            prices = [last]
+            for t in range(horizon_months):
+                shock = np.random.normal(mu, sigma)
+                prices.append(prices[-1] * (1 + shock))
+            sims[i, :] = prices[1:]
 
-    series = df[equip].dropna()
+        # Percentiles 5, 50 (mediana), 95
+        pctiles = np.percentile(sims, [5, 50, 95], axis=0)
 
-    # Cálculo de retornos históricos
-    returns = series.pct_change().dropna()
+        df_pct = pd.DataFrame({
+            "month": range(1, horizon_months + 1),
+            "p5": pctiles[0],
+            "p50": pctiles[1],
+            "p95": pctiles[2]
+        })
 
-    mu = returns.mean()        # retorno promedio
-    sigma = returns.std()      # volatilidad histórica
-    last = series.iloc[-1]     # último valor observable
+        out_file = save_table(
+            df_pct,
+            OUTPUT_MC_DIR / f"montecarlo_{equip}",
+            export_csv=export_csv,
+            index=False,
+        )
 
-    sims = np.zeros((n_sim, horizon_months))
+        results[equip] = df_pct
 
-    for i in range(n_sim):
-        prices = [last]
-        for t in range(horizon_months):
-            shock = np.random.normal(mu, sigma)
-            prices.append(prices[-1] * (1 + shock))
-        sims[i, :] = prices[1:]
+        print(f"  Archivo generado → {out_file}")
 
-    # Percentiles 5, 50 (mediana), 95
-    pctiles = np.percentile(sims, [5, 50, 95], axis=0)
 
-    df_pct = pd.DataFrame({
-        "month": range(1, horizon_months + 1),
-        "p5": pctiles[0],
-        "p50": pctiles[1],
-        "p95": pctiles[2]
-    })
+    print("\n=== MONTE CARLO COMPLETADO ===")
+    print(f"Resultados guardados en: {OUTPUT_MC_DIR}\n")
 
-    out_file = OUTPUT_MC_DIR / f"montecarlo_{equip}.csv"
-    df_pct.to_csv(out_file, index=False)
+    return results
 
-    results[equip] = df_pct
 
-    print(f"  Archivo generado → {out_file}")
+if __name__ == "__main__":
+    import argparse
 
+    parser = argparse.ArgumentParser(description="Simulación Monte Carlo a 36 meses por equipo")
+    parser.add_argument("--csv", action="store_true",
+                        help="Exportar también los resultados en CSV")
+    parser.add_argument("--formulas", type=Path, default=FORMULAS_PATH,
+                        help="Configuración de fórmulas usada en la estimación")
+    args = parser.parse_args()
 
-print("\n=== MONTE CARLO COMPLETADO ===")
-print(f"Resultados guardados en: {OUTPUT_MC_DIR}\n")
+    run_montecarlo(export_csv=args.csv, formulas_path=args.formulas)
@@ -0,0 +1,299 @@
+#!/usr/bin/env python3
+"""
+pipeline.py
+Punto de entrada único para estimación → forecast → Monte Carlo.
+
+- Modela las etapas como un DAG y las ejecuta en un solo proceso
+  (pandas/prophet se importan una vez y solo si la etapa corre).
+- Cada etapa se omite si la huella de sus entradas, su código y sus
+  parámetros no cambió desde la última ejecución y sus salidas existen.
+- Las etapas independientes (forecast y Monte Carlo) corren en paralelo;
+  las gráficas son una etapa opcional al final (src/plotting.py).
+- Los tiempos por etapa se imprimen y se guardan en
+  data/processed/pipeline_timings.json para el job nocturno.
+
+Uso:
+    python src/pipeline.py [--force] [--incremental] [--csv] [--workers N] [--no-plots]
+                           [--formulas config/otras_formulas.csv]
+"""
+
+import argparse
+import hashlib
+import json
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List
+
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+if str(ROOT_DIR) not in sys.path:
+    sys.path.append(str(ROOT_DIR))
+
+from src.formulas import FORMULAS_PATH, load_formulas
+
+SRC_DIR = ROOT_DIR / "src"
+DATA_DIR = ROOT_DIR / "data"
+RAW_DIR = DATA_DIR / "raw"
+PROCESSED_DIR = DATA_DIR / "processed"
+PLOTS_DIR = DATA_DIR / "plots"
+
+STORE_PATH = PROCESSED_DIR / "estimated_equipment_prices.parquet"
+SUMMARY_PATH = PROCESSED_DIR / "summary_estimates.parquet"
+CACHE_PATH = PROCESSED_DIR / "pipeline_cache.json"
+TIMINGS_PATH = PROCESSED_DIR / "pipeline_timings.json"
+
+
+# ---------------------------------------------------------------------------
+# Huellas
+# ---------------------------------------------------------------------------
+def path_fingerprint(path: Path) -> list:
+    """Tamaño y mtime de un archivo, o de todas las partes de un directorio."""
+    if path.is_dir():
+        return [path_fingerprint(p) for p in sorted(path.rglob("*")) if p.is_file()]
+    if not path.exists():
+        return [str(path), None]
+    st = path.stat()
+    return [str(path), st.st_size, st.st_mtime_ns]
+
+
+def stage_key(inputs: List[Path], params: dict) -> str:
+    payload = {
+        "inputs": [path_fingerprint(p) for p in inputs],
+        "params": params,
+    }
+    return hashlib.sha1(json.dumps(payload, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+# ---------------------------------------------------------------------------
+# Etapas
+# ---------------------------------------------------------------------------
+def _code(*modules: str) -> List[Path]:
+    """Módulos de src/ de los que depende una etapa (incluidos los importados)."""
+    return [SRC_DIR / f"{m}.py" for m in modules]
+
+
+def _equipment(formulas_path: Path = FORMULAS_PATH) -> list:
+    return list(load_formulas(formulas_path)[0].index)
+
+
+def _run_estimation(params: dict) -> None:
+    from src.estimation_script import main as estimation_main
+
+    estimation_main(
+        export_csv=params["export_csv"],
+        incremental=params["incremental"],
+        formulas_path=Path(params["formulas_path"]),
+        plot=False,
+    )
+
+
+def _run_forecast(params: dict) -> None:
+    from src.forecasting_36m import run_forecast
+
+    run_forecast(
+        export_csv=params["export_csv"],
+        horizon_months=params["horizon_months"],
+        formulas_path=Path(params["formulas_path"]),
+    )
+
+
+def _run_montecarlo(params: dict) -> None:
+    from src.montecarlo_36m import run_montecarlo
+
+    run_montecarlo(
+        export_csv=params["export_csv"],
+        n_sim=params["n_sim"],
+        horizon_months=params["horizon_months"],
+        formulas_path=Path(params["formulas_path"]),
+    )
+
+
+def _run_plots(params: dict) -> None:
+    from src.plotting import render_equipment_plots
+
+    render_equipment_plots(_equipment(Path(params["formulas_path"])), width_px=params["width_px"])
+
+
+def default_stages(
+    export_csv: bool = False,
+    incremental: bool = False,
+    plots: bool = True,
+    formulas_path: Path = FORMULAS_PATH,
+) -> Dict[str, dict]:
+    """
+    Definición del DAG. Cada etapa declara:
+    deps, inputs (archivos cuya huella forma la clave), outputs, params y run.
+    Todas las etapas usan la misma configuración de fórmulas (formulas_path).
+    """
+    formulas_path = Path(formulas_path)
+    sources = list(load_formulas(formulas_path)[0].columns)
+
+    def forecast_outputs():
+        return [PROCESSED_DIR / "forecast" / f"forecast_{e}.parquet" for e in _equipment(formulas_path)]
+
+    def montecarlo_outputs():
+        return [PROCESSED_DIR / "montecarlo" / f"montecarlo_{e}.parquet" for e in _equipment(formulas_path)]
+
+    stages = {
+        "estimation": {
+            "deps": [],
+            "inputs": lambda: (
+                [RAW_DIR / f"{name}.csv" for name in sources]
+                + [formulas_path]
+                + _code("estimation_script", "formulas", "running_stats", "storage")
+            ),
+            "outputs": lambda: [STORE_PATH, SUMMARY_PATH],
+            "params": {"export_csv": export_csv, "incremental": incremental, "formulas_path": str(formulas_path)},
+            "run": _run_estimation,
+        },
+        "forecast": {
+            "deps": ["estimation"],
+            "inputs": lambda: [STORE_PATH, formulas_path] + _code("forecasting_36m", "formulas", "storage"),
+            "outputs": forecast_outputs,
+            "params": {"export_csv": export_csv, "horizon_months": 36, "formulas_path": str(formulas_path)},
+            "run": _run_forecast,
+        },
+        "montecarlo": {
+            "deps": ["estimation"],
+            "inputs": lambda: [STORE_PATH, formulas_path] + _code("montecarlo_36m", "formulas", "storage"),
+            "outputs": montecarlo_outputs,
+            "params": {
+                "export_csv": export_csv,
+                "n_sim": 10000,
+                "horizon_months": 36,
+                "formulas_path": str(formulas_path),
+            },
+            "run": _run_montecarlo,
+        },
+    }
+    if plots:
+        stages["plots"] = {
+            "deps": ["estimation", "forecast", "montecarlo"],
+            "inputs": lambda: (
+                [STORE_PATH, formulas_path]
+                + _code("plotting", "formulas", "storage")
+                + forecast_outputs()
+                + montecarlo_outputs()
+            ),
+            "outputs": lambda: (
+                [PLOTS_DIR / "equipment_prices_plot.png"]
+                + [PLOTS_DIR / f"bands_{e}.png" for e in _equipment(formulas_path)]
+            ),
+            "params": {"width_px": 1000, "formulas_path": str(formulas_path)},
+            "run": _run_plots,
+        }
+    return stages
+
+
+# ---------------------------------------------------------------------------
+# Runner
+# ---------------------------------------------------------------------------
+def _load_json(path: Path) -> dict:
+    if not path.exists():
+        return {}
+    return json.loads(path.read_text(encoding="utf-8"))
+
+
+def _execute(stage: dict, cached_key: str, force: bool) -> dict:
+    """Ejecuta una etapa (o la omite si su clave no cambió)."""
+    t0 = time.perf_counter()
+    key = stage_key(stage["inputs"](), stage["params"])
+    outputs_ok = all(p.exists() for p in stage["outputs"]())
+
+    if not force and key == cached_key and outputs_ok:
+        return {"status": "cached", "seconds": time.perf_counter() - t0, "key": key}
+
+    stage["run"](stage["params"])
+    return {"status": "ran", "seconds": time.perf_counter() - t0, "key": key}
+
+
+def run_pipeline(
+    stages: Dict[str, dict],
+    force: bool = False,
+    max_workers: int = 2,
+    cache_path: Path = CACHE_PATH,
+    timings_path: Path = TIMINGS_PATH,
+) -> dict:
+    """
+    Ejecuta el DAG: cada etapa arranca en cuanto terminan sus dependencias,
+    y las etapas listas a la vez corren en paralelo (hilos).
+    Devuelve {etapa: {"status": "ran"|"cached", "seconds": ...}}.
+    """
+    unknown = {d for s in stages.values() for d in s["deps"]} - set(stages)
+    if unknown:
+        raise ValueError(f"Dependencias desconocidas en el pipeline: {sorted(unknown)}")
+
+    cache = _load_json(cache_path)
+    results: Dict[str, dict] = {}
+    pending = dict(stages)
+    started = datetime.now().isoformat()
+    t0 = time.perf_counter()
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        running = {}
+        while pending or running:
+            ready = [n for n, s in pending.items() if all(d in results for d in s["deps"])]
+            for name in ready:
+                stage = pending.pop(name)
+                cached_key = cache.get(name, {}).get("key")
+                running[pool.submit(_execute, stage, cached_key, force)] = name
+
+            if not running:
+                raise ValueError(f"Ciclo en el pipeline: {sorted(pending)}")
+
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for fut in finished:
+                name = running.pop(fut)
+                results[name] = fut.result()
+                cache[name] = {"key": results[name]["key"]}
+                cache_path.parent.mkdir(parents=True, exist_ok=True)
+                cache_path.write_text(json.dumps(cache, indent=2), encoding="utf-8")
+
+    total = time.perf_counter() - t0
+
+    print("\n=== TIEMPOS POR ETAPA ===")
+    for name in stages:
+        r = results[name]
+        print(f" {name:<12} {r['status']:<7} {r['seconds']:8.2f}s")
+    print(f" {'total':<12} {'':<7} {total:8.2f}s")
+    print("=========================\n")
+
+    timings_path.parent.mkdir(parents=True, exist_ok=True)
+    timings_path.write_text(json.dumps({
+        "started": started,
+        "total_seconds": total,
+        "stages": {n: {"status": r["status"], "seconds": r["seconds"]} for n, r in results.items()},
+    }, indent=2), encoding="utf-8")
+
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pipeline estimación → forecast → Monte Carlo")
+    parser.add_argument("--force", action="store_true",
+                        help="Ejecutar todas las etapas aunque no hayan cambiado")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Estimación incremental (solo fechas nuevas)")
+    parser.add_argument("--csv", action="store_true",
+                        help="Exportar también los resultados en CSV")
+    parser.add_argument("--workers", type=int, default=2,
+                        help="Etapas independientes en paralelo")
+    parser.add_argument("--no-plots", action="store_true",
+                        help="Omitir la etapa de gráficas")
+    parser.add_argument("--formulas", type=Path, default=FORMULAS_PATH,
+                        help="CSV de fórmulas de equipos (pesos por entrada)")
+    args = parser.parse_args()
+
+    run_pipeline(
+        default_stages(
+            export_csv=args.csv,
+            incremental=args.incremental,
+            plots=not args.no_plots,
+            formulas_path=args.formulas,
+        ),
+        force=args.force,
+        max_workers=args.workers,
+    )
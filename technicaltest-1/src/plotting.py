@@ -0,0 +1,201 @@
+"""
+plotting.py
+Etapa opcional de gráficas.
+
+- matplotlib se importa solo al graficar y siempre con backend Agg
+  (sin ventana; apto para servidores y procesos hijos).
+- Cada serie se reduce con LTTB (Largest-Triangle-Three-Buckets) a un
+  presupuesto de puntos igual al ancho en píxeles: la forma visual se
+  conserva y el costo de dibujo no crece con la longitud del histórico.
+- Bandas de forecast (yhat_lower/yhat_upper) y Monte Carlo (p5/p95).
+- Las gráficas por equipo se renderizan en paralelo en procesos.
+"""
+
+import sys
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import List, Optional
+
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+DATA_DIR = ROOT_DIR / "data"
+PROCESSED_DIR = DATA_DIR / "processed"
+PLOTS_DIR = DATA_DIR / "plots"
+
+if str(ROOT_DIR) not in sys.path:
+    sys.path.append(str(ROOT_DIR))
+
+from src.storage import load_table, table_exists
+
+FILE_STEM = PROCESSED_DIR / "estimated_equipment_prices"
+
+PLOT_WIDTH_PX = 1000
+DPI = 100
+
+
+def _pyplot():
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    return plt
+
+
+# ---------------------------------------------------------------------------
+# Downsampling
+# ---------------------------------------------------------------------------
+def lttb(x: np.ndarray, y: np.ndarray, threshold: int) -> np.ndarray:
+    """
+    Índices de los puntos elegidos por LTTB (Steinarsson, 2013).
+    Conserva el primer y último punto; en cada bucket elige el punto que
+    forma el triángulo de mayor área con el anterior elegido y el
+    promedio del bucket siguiente.
+    """
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    edges = np.linspace(1, n - 1, threshold - 1).astype(int)
+    selected = np.empty(threshold, dtype=int)
+    selected[0] = 0
+    selected[-1] = n - 1
+
+    a = 0
+    for i in range(threshold - 2):
+        lo, hi = edges[i], edges[i + 1]
+        nxt_lo, nxt_hi = edges[i + 1], edges[i + 2] if i + 2 < len(edges) else n
+        avg_x = x[nxt_lo:nxt_hi].mean()
+        avg_y = y[nxt_lo:nxt_hi].mean()
+
+        area = np.abs(
+            (x[a] - avg_x) * (y[lo:hi] - y[a])
+            - (x[a] - x[lo:hi]) * (avg_y - y[a])
+        )
+        a = lo + int(np.argmax(area))
+        selected[i + 1] = a
+
+    return selected
+
+
+def _x_values(index: pd.Index) -> np.ndarray:
+    if isinstance(index, pd.DatetimeIndex):
+        return index.asi8.astype("float64")
+    return np.arange(len(index), dtype="float64")
+
+
+def downsample(series: pd.Series, threshold: int = PLOT_WIDTH_PX) -> pd.Series:
+    """Reduce una serie (sin NaN) a lo sumo threshold puntos con LTTB."""
+    series = series.dropna()
+    idx = lttb(_x_values(series.index), series.to_numpy(dtype="float64"), threshold)
+    return series.iloc[idx]
+
+
+# ---------------------------------------------------------------------------
+# Gráficas
+# ---------------------------------------------------------------------------
+def plot_equipment_prices(
+    df: pd.DataFrame,
+    out_path: Path,
+    width_px: int = PLOT_WIDTH_PX,
+    title: str = "Estimated Equipment Base Prices",
+) -> Path:
+    """Una línea por equipo, cada una reducida al ancho en píxeles."""
+    plt = _pyplot()
+    fig, ax = plt.subplots(figsize=(width_px / DPI, width_px / DPI / 2), dpi=DPI)
+    for col in df.columns:
+        s = downsample(df[col], width_px)
+        ax.plot(s.index, s.to_numpy(), label=col)
+    ax.set_title(title)
+    ax.set_xlabel("Index (fecha o posición)")
+    ax.set_ylabel("Precio")
+    ax.legend()
+    fig.tight_layout()
+    fig.savefig(out_path)
+    plt.close(fig)
+    return out_path
+
+
+def _render_bands(job: dict) -> Path:
+    """Dibuja histórico + bandas ya reducidas (se ejecuta en un proceso hijo)."""
+    plt = _pyplot()
+    width_px = job["width_px"]
+    fig, ax = plt.subplots(figsize=(width_px / DPI, width_px / DPI / 2), dpi=DPI)
+
+    hist = job["history"]
+    ax.plot(hist.index, hist.to_numpy(), color="tab:blue", label="histórico")
+
+    fc = job.get("forecast")
+    if fc is not None:
+        ax.plot(fc.index, fc["yhat"], color="tab:orange", label="forecast")
+        ax.fill_between(fc.index, fc["yhat_lower"], fc["yhat_upper"],
+                        color="tab:orange", alpha=0.2)
+
+    mc = job.get("montecarlo")
+    if mc is not None:
+        ax.plot(mc.index, mc["p50"], color="tab:green", label="Monte Carlo p50")
+        ax.fill_between(mc.index, mc["p5"], mc["p95"], color="tab:green", alpha=0.2,
+                        label="Monte Carlo p5–p95")
+
+    ax.set_title(job["title"])
+    ax.set_ylabel("Precio")
+    ax.legend()
+    fig.tight_layout()
+    fig.savefig(job["out_path"])
+    plt.close(fig)
+    return job["out_path"]
+
+
+def _band_job(equip: str, history: pd.Series, width_px: int) -> dict:
+    """Prepara (y reduce) los datos de un equipo para _render_bands."""
+    job = {
+        "title": f"{equip}: histórico, forecast y Monte Carlo",
+        "history": downsample(history, width_px),
+        "out_path": PLOTS_DIR / f"bands_{equip}.png",
+        "width_px": width_px,
+    }
+
+    fc_stem = PROCESSED_DIR / "forecast" / f"forecast_{equip}"
+    if table_exists(fc_stem):
+        fc = load_table(fc_stem, index=False)
+        fc = fc.set_index(pd.to_datetime(fc["ds"]))
+        keep = lttb(_x_values(fc.index), fc["yhat"].to_numpy(dtype="float64"), width_px)
+        job["forecast"] = fc.iloc[keep]
+
+    mc_stem = PROCESSED_DIR / "montecarlo" / f"montecarlo_{equip}"
+    if table_exists(mc_stem):
+        mc = load_table(mc_stem, index=False)
+        clean = history.dropna()
+        if isinstance(clean.index, pd.DatetimeIndex) and len(clean):
+            last = clean.index[-1]
+            mc.index = pd.DatetimeIndex([last + pd.DateOffset(months=int(m)) for m in mc["month"]])
+        else:
+            mc.index = len(history) - 1 + mc["month"].to_numpy()
+        job["montecarlo"] = mc
+
+    return job
+
+
+def render_equipment_plots(
+    equipment: List[str],
+    width_px: int = PLOT_WIDTH_PX,
+    max_workers: Optional[int] = None,
+) -> List[Path]:
+    """
+    Genera la gráfica conjunta y una gráfica de bandas por equipo.
+    Los datos se reducen en el proceso principal y solo los puntos
+    reducidos viajan a los procesos que dibujan.
+    """
+    PLOTS_DIR.mkdir(parents=True, exist_ok=True)
+    df = load_table(FILE_STEM, columns=equipment)
+
+    outputs = [plot_equipment_prices(df, PLOTS_DIR / "equipment_prices_plot.png", width_px)]
+
+    jobs = [_band_job(e, df[e], width_px) for e in equipment]
+    if max_workers == 1 or len(jobs) <= 1:
+        outputs += [_render_bands(job) for job in jobs]
+    else:
+        with ProcessPoolExecutor(max_workers=max_workers) as pool:
+            outputs += list(pool.map(_render_bands, jobs))
+
+    return outputs
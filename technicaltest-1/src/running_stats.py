@@ -0,0 +1,211 @@
+"""
+running_stats.py
+Agregados incrementales para el resumen de precios estimados.
+
+- RunningStats: count / mean / M2 / min / max combinables (algoritmo de
+  Chan et al.), más cuartiles en streaming con el algoritmo P².
+- Reemplaza a DataFrame.describe() cuando solo llegan filas nuevas:
+  el estado se serializa a JSON y se actualiza con cada lote.
+"""
+
+import math
+import numpy as np
+import pandas as pd
+from typing import Dict, List, Optional
+
+
+QUANTILES = [0.25, 0.5, 0.75]
+
+
+class P2Quantile:
+    """
+    Estimador P² (Jain & Chlamtac, 1985) de un cuantil en streaming:
+    cinco marcadores, memoria O(1) por cuantil.
+    """
+
+    def __init__(self, p: float):
+        self.p = p
+        self.heights: List[float] = []
+        self.positions: List[float] = [1, 2, 3, 4, 5]
+        self.desired: List[float] = [1, 1 + 2 * p, 1 + 4 * p, 3 + 2 * p, 5]
+        self.increments: List[float] = [0, p / 2, p, (1 + p) / 2, 1]
+
+    @classmethod
+    def from_values(cls, values: np.ndarray, p: float) -> "P2Quantile":
+        """Inicializa los marcadores con cuantiles exactos de un lote."""
+        est = cls(p)
+        values = np.sort(values[~np.isnan(values)])
+        n = len(values)
+        if n < 5:
+            for v in values:
+                est.add(float(v))
+            return est
+
+        est.desired = [1 + (n - 1) * f for f in est.increments]
+        positions = [round(d) for d in est.desired]
+        # Las posiciones deben ser estrictamente crecientes
+        for i in range(1, 5):
+            positions[i] = max(positions[i], positions[i - 1] + 1)
+        for i in range(3, -1, -1):
+            positions[i] = min(positions[i], positions[i + 1] - 1)
+        est.positions = [float(pos) for pos in positions]
+        est.heights = [float(values[int(pos) - 1]) for pos in est.positions]
+        return est
+
+    def add(self, x: float) -> None:
+        if len(self.heights) < 5:
+            self.heights.append(x)
+            self.heights.sort()
+            return
+
+        q, n = self.heights, self.positions
+        if x < q[0]:
+            q[0] = x
+            k = 0
+        elif x >= q[4]:
+            q[4] = x
+            k = 3
+        else:
+            k = next(i for i in range(4) if q[i] <= x < q[i + 1])
+
+        for i in range(k + 1, 5):
+            n[i] += 1
+        for i in range(5):
+            self.desired[i] += self.increments[i]
+
+        # Ajustar marcadores intermedios (interpolación parabólica)
+        for i in range(1, 4):
+            d = self.desired[i] - n[i]
+            if (d >= 1 and n[i + 1] - n[i] > 1) or (d <= -1 and n[i - 1] - n[i] < -1):
+                s = 1 if d > 0 else -1
+                qp = q[i] + s / (n[i + 1] - n[i - 1]) * (
+                    (n[i] - n[i - 1] + s) * (q[i + 1] - q[i]) / (n[i + 1] - n[i])
+                    + (n[i + 1] - n[i] - s) * (q[i] - q[i - 1]) / (n[i] - n[i - 1])
+                )
+                if not q[i - 1] < qp < q[i + 1]:
+                    qp = q[i] + s * (q[i + s] - q[i]) / (n[i + s] - n[i])
+                q[i] = qp
+                n[i] += s
+
+    def value(self) -> float:
+        if not self.heights:
+            return float("nan")
+        if len(self.heights) < 5:
+            return float(np.quantile(self.heights, self.p))
+        return self.heights[2]
+
+    def to_dict(self) -> dict:
+        return {
+            "p": self.p,
+            "heights": self.heights,
+            "positions": self.positions,
+            "desired": self.desired,
+        }
+
+    @classmethod
+    def from_dict(cls, d: dict) -> "P2Quantile":
+        est = cls(d["p"])
+        est.heights = list(d["heights"])
+        est.positions = list(d["positions"])
+        est.desired = list(d["desired"])
+        return est
+
+
+class RunningStats:
+    """Agregados combinables de una columna numérica."""
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+        self.quantiles: Dict[float, P2Quantile] = {}
+
+    @classmethod
+    def from_values(cls, values) -> "RunningStats":
+        """Estado inicial a partir de un lote completo (cuartiles exactos)."""
+        values = np.asarray(values, dtype="float64")
+        stats = cls()
+        stats.merge(cls._batch(values))
+        stats.quantiles = {p: P2Quantile.from_values(values, p) for p in QUANTILES}
+        return stats
+
+    @classmethod
+    def _batch(cls, values: np.ndarray) -> "RunningStats":
+        values = values[~np.isnan(values)]
+        batch = cls()
+        if len(values):
+            batch.count = len(values)
+            batch.mean = float(values.mean())
+            batch.m2 = float(((values - batch.mean) ** 2).sum())
+            batch.min = float(values.min())
+            batch.max = float(values.max())
+        return batch
+
+    def merge(self, other: "RunningStats") -> None:
+        """Combina count/mean/M2/min/max de otro agregado (Chan et al.)."""
+        if other.count == 0:
+            return
+        n = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean += delta * other.count / n
+        self.m2 += other.m2 + delta ** 2 * self.count * other.count / n
+        self.count = n
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    def update(self, values) -> None:
+        """Incorpora un lote de valores nuevos (NaN se ignoran)."""
+        values = np.asarray(values, dtype="float64")
+        values = values[~np.isnan(values)]
+        self.merge(self._batch(values))
+        for p in QUANTILES:
+            est = self.quantiles.setdefault(p, P2Quantile(p))
+            for v in values:
+                est.add(float(v))
+
+    def describe(self) -> pd.Series:
+        """Mismo índice que DataFrame.describe() para una columna."""
+        std = math.sqrt(self.m2 / (self.count - 1)) if self.count > 1 else float("nan")
+        empty = self.count == 0
+        return pd.Series({
+            "count": float(self.count),
+            "mean": float("nan") if empty else self.mean,
+            "std": std,
+            "min": float("nan") if empty else self.min,
+            **{f"{int(p * 100)}%": self.quantiles[p].value() if p in self.quantiles else float("nan")
+               for p in QUANTILES},
+            "max": float("nan") if empty else self.max,
+        })
+
+    def to_dict(self) -> dict:
+        return {
+            "count": self.count,
+            "mean": self.mean,
+            "m2": self.m2,
+            "min": None if self.count == 0 else self.min,
+            "max": None if self.count == 0 else self.max,
+            "quantiles": [q.to_dict() for q in self.quantiles.values()],
+        }
+
+    @classmethod
+    def from_dict(cls, d: dict) -> "RunningStats":
+        stats = cls()
+        stats.count = d["count"]
+        stats.mean = d["mean"]
+        stats.m2 = d["m2"]
+        stats.min = math.inf if d["min"] is None else d["min"]
+        stats.max = -math.inf if d["max"] is None else d["max"]
+        stats.quantiles = {q["p"]: P2Quantile.from_dict(q) for q in d["quantiles"]}
+        return stats
+
+
+def summarize(stats: Dict[str, RunningStats]) -> pd.DataFrame:
+    """Tabla tipo describe() a partir de los agregados por columna."""
+    return pd.DataFrame({col: s.describe() for col, s in stats.items()})
+
+
+def stats_from_frame(df: pd.DataFrame, columns: Optional[List[str]] = None) -> Dict[str, RunningStats]:
+    columns = columns or list(df.columns)
+    return {c: RunningStats.from_values(df[c].to_numpy()) for c in columns}
@@ -0,0 +1,107 @@
+"""
+storage.py
+Almacenamiento columnar de los resultados intermedios entre etapas
+(estimación → forecast → Monte Carlo).
+
+Formato principal: Parquet (conserva índice de fechas y tipos).
+Exportación CSV opcional para consumo externo. La lectura admite
+proyección de columnas y, si solo existe el CSV heredado, lo usa.
+append_table convierte la tabla en un dataset de partes
+(<stem>.parquet/part-NNNNN.parquet) para añadir filas sin reescribir.
+"""
+
+import shutil
+import pandas as pd
+from pathlib import Path
+from typing import List, Optional
+
+
+PARQUET_SUFFIX = ".parquet"
+CSV_SUFFIX = ".csv"
+
+
+def table_exists(stem: Path) -> bool:
+    """True si existe la tabla en Parquet o en CSV."""
+    return stem.with_suffix(PARQUET_SUFFIX).exists() or stem.with_suffix(CSV_SUFFIX).exists()
+
+
+def save_table(
+    df: pd.DataFrame,
+    stem: Path,
+    export_csv: bool = False,
+    index: bool = True,
+) -> Path:
+    """
+    Guarda df en <stem>.parquet y, si export_csv=True, también en <stem>.csv.
+    Devuelve la ruta del Parquet.
+    """
+    stem.parent.mkdir(parents=True, exist_ok=True)
+    out = stem.with_suffix(PARQUET_SUFFIX)
+    if out.is_dir():
+        shutil.rmtree(out)
+    df.to_parquet(out, index=index)
+
+    if export_csv:
+        df.to_csv(stem.with_suffix(CSV_SUFFIX), index=index)
+
+    return out
+
+
+def append_table(df: pd.DataFrame, stem: Path, export_csv: bool = False) -> Path:
+    """
+    Añade df como una nueva parte de <stem>.parquet (sin reescribir las
+    anteriores). Si la tabla era un único archivo, pasa a ser la parte 0.
+    """
+    out = stem.with_suffix(PARQUET_SUFFIX)
+    if out.is_file():
+        tmp = out.with_name(out.name + ".tmp")
+        out.rename(tmp)
+        out.mkdir()
+        tmp.rename(out / "part-00000.parquet")
+    out.mkdir(parents=True, exist_ok=True)
+
+    part = out / f"part-{len(list(out.glob('part-*.parquet'))):05d}.parquet"
+    df.to_parquet(part, index=True)
+
+    if export_csv:
+        csv_path = stem.with_suffix(CSV_SUFFIX)
+        df.to_csv(csv_path, mode="a", header=not csv_path.exists())
+
+    return part
+
+
+def load_table(
+    stem: Path,
+    columns: Optional[List[str]] = None,
+    index: bool = True,
+) -> pd.DataFrame:
+    """
+    Lee <stem>.parquet leyendo solo las columnas pedidas (el índice
+    se restaura siempre). Si no existe, recurre a <stem>.csv, cuya
+    primera columna es el índice salvo que se guardara con index=False.
+    """
+    parquet_path = stem.with_suffix(PARQUET_SUFFIX)
+    if parquet_path.is_dir():
+        return pd.read_parquet(parquet_path, columns=columns).sort_index()
+    if parquet_path.exists():
+        return pd.read_parquet(parquet_path, columns=columns)
+
+    csv_path = stem.with_suffix(CSV_SUFFIX)
+    if not csv_path.exists():
+        raise FileNotFoundError(f"No se encontró la tabla: {parquet_path} ni {csv_path}")
+
+    if not index:
+        return pd.read_csv(csv_path, usecols=columns)
+
+    # CSV heredado: primera columna = índice
+    header = pd.read_csv(csv_path, nrows=0).columns.tolist()
+    usecols = None
+    if columns is not None:
+        usecols = [header[0]] + [c for c in columns if c in header[1:]]
+    df = pd.read_csv(csv_path, index_col=0, usecols=usecols)
+    if pd.api.types.is_string_dtype(df.index):
+        try:
+            df.index = pd.to_datetime(df.index)
+        except (ValueError, TypeError):
+            pass
+    return df
@@ -11,3 +11,230 @@ from src.estimation_script import first_numeric_col
 def test_first_numeric_col_temp():
     df = pd.DataFrame({'Date': ['2020-01-01'], 'Price': [10.0]})
     assert first_numeric_col(df) == 'Price'
+
+
+def test_robust_read_csv_streams_european_file(tmp_path):
+    from src.estimation_script import robust_read_csv
+
+    path = tmp_path / "Y.csv"
+    path.write_text("\ufeffDate;Price\n12/9/2023;1.547,33\n11/9/2023;546\n", encoding="utf-8")
+
+    df = robust_read_csv(path, chunksize=1)
+
+    assert list(df.columns) == ["Date", "Price"]
+    assert df["Price"].tolist() == [1547.33, 546.0]
+    assert df.attrs["ingest_stats"]["sep"] == ";"
+
+
+def test_robust_read_csv_keeps_us_decimals(tmp_path):
+    from src.estimation_script import robust_read_csv
+
+    path = tmp_path / "X.csv"
+    path.write_text("Date,Price\n2024-04-04,12.5\n2024-04-03,1911.96725\n", encoding="utf-8")
+
+    df = robust_read_csv(path)
+
+    assert df["Price"].tolist() == [12.5, 1911.96725]
+
+
+def test_robust_read_csv_mixed_european_and_us_columns(tmp_path):
+    from src.estimation_script import robust_read_csv
+
+    path = tmp_path / "mixed.csv"
+    path.write_text(
+        "Fecha;EU;US\n"
+        "1/1/2024;1.234,5;1,234.5\n"
+        "2/1/2024;12,5;12.5\n"
+        "3/1/2024;n/d;7\n",
+        encoding="utf-8",
+    )
+
+    df = robust_read_csv(path)
+
+    assert df.attrs["ingest_stats"]["formats"] == {"EU": "eu", "US": "us"}
+    assert df["EU"].tolist()[:2] == [1234.5, 12.5]
+    assert pd.isna(df["EU"].iloc[2])
+    assert df["US"].tolist() == [1234.5, 12.5, 7.0]
+
+
+def test_robust_read_csv_eu_column_independent_of_chunking(tmp_path):
+    from src.estimation_script import robust_read_csv
+
+    path = tmp_path / "mixed.csv"
+    path.write_text("EU;US\n1.234,5;1,234.5\n1.500;12.5\n", encoding="utf-8")
+
+    whole = robust_read_csv(path)
+    chunked = robust_read_csv(path, chunksize=1)
+
+    assert whole["EU"].tolist() == [1234.5, 1500.0]
+    assert chunked["EU"].tolist() == [1234.5, 1500.0]
+
+
+def test_robust_read_csv_keeps_dotted_dates_in_european_file(tmp_path):
+    from src.estimation_script import maybe_parse_date, robust_read_csv
+
+    path = tmp_path / "Y.csv"
+    path.write_text("Fecha;Precio\n12.09.2023;1.547,33\n13.09.2023;546\n", encoding="utf-8")
+
+    df = robust_read_csv(path)
+
+    assert df["Fecha"].tolist() == ["12.09.2023", "13.09.2023"]
+    assert df["Precio"].tolist() == [1547.33, 546.0]
+    assert maybe_parse_date(df).index[0] == pd.Timestamp("2023-09-12")
+
+
+def test_robust_read_csv_stops_tracing_when_the_read_fails(tmp_path):
+    import tracemalloc
+    import pytest
+    from src.estimation_script import robust_read_csv
+
+    path = tmp_path / "empty.csv"
+    path.write_text("Date,Price\n", encoding="utf-8")
+
+    with pytest.raises(ValueError):
+        robust_read_csv(path, report=True)
+
+    assert not tracemalloc.is_tracing()
+
+
+def test_incremental_run_matches_full_recompute(tmp_path, monkeypatch):
+    import src.estimation_script as es
+    from src.storage import load_table
+
+    monkeypatch.setattr(es, "STORE_STEM", tmp_path / "estimated")
+    monkeypatch.setattr(es, "SUMMARY_STEM", tmp_path / "summary")
+    monkeypatch.setattr(es, "STATE_PATH", tmp_path / "state.json")
+
+    paths = {n: tmp_path / f"{n}.csv" for n in "XYZ"}
+    paths["X"].write_text("Date,Price\n2024-01-01,10.5\n2024-01-02,11.5\n")
+    paths["Y"].write_text("Date;Price\n1/1/2024;20,5\n")
+    paths["Z"].write_text("Price,Date\n30.0,2024-01-01\n31.0,2024-01-02\n")
+
+    formulas = es.load_formulas()
+    es.full_run(paths, formulas)
+
+    # X gana una fecha nueva; Y completa una fecha ya publicada
+    with open(paths["X"], "a") as fh:
+        fh.write("2024-01-03,12.5\n")
+    with open(paths["Y"], "a") as fh:
+        fh.write("2/1/2024;21,5\n")
+
+    assert es.incremental_run(paths, es.load_state(), formulas) == 2
+    assert es.incremental_run(paths, es.load_state(), formulas) == 0
+
+    incremental = load_table(tmp_path / "estimated")
+    summary = load_table(tmp_path / "summary")
+    expected = es.full_run(paths, formulas)
+
+    pd.testing.assert_frame_equal(incremental, expected, check_freq=False)
+    for row in ["count", "mean", "min", "max"]:
+        assert summary.loc[row].round(9).equals(expected.describe().loc[row].round(9))
+
+
+def _spy_reads(monkeypatch, es):
+    """Registra (archivo, filas) de cada robust_read_csv."""
+    reads = []
+    original = es.robust_read_csv
+
+    def spy(path, **kwargs):
+        df = original(path, **kwargs)
+        reads.append((path.name, len(df)))
+        return df
+
+    monkeypatch.setattr(es, "robust_read_csv", spy)
+    return reads
+
+
+def test_incremental_reads_newest_first_files_from_the_head(tmp_path, monkeypatch):
+    import src.estimation_script as es
+    from src.storage import load_table
+
+    monkeypatch.setattr(es, "STORE_STEM", tmp_path / "estimated")
+    monkeypatch.setattr(es, "SUMMARY_STEM", tmp_path / "summary")
+    monkeypatch.setattr(es, "STATE_PATH", tmp_path / "state.json")
+
+    dates = pd.date_range("2010-01-01", periods=3 * es.HEAD_CHUNK_ROWS)
+    paths = {n: tmp_path / f"{n}.csv" for n in "XYZ"}
+    for n, p in paths.items():
+        rows = "".join(f"{d:%Y-%m-%d},{i}.5\n" for i, d in enumerate(dates))
+        p.write_text("Date,Price\n" + rows, encoding="utf-8")
+    # X descendente, como data/raw/X.csv
+    body = "".join(f"{d:%Y-%m-%d},{i}.5\n" for i, d in reversed(list(enumerate(dates))))
+    paths["X"].write_text("Date,Price\n" + body, encoding="utf-8")
+
+    formulas = es.load_formulas()
+    es.full_run(paths, formulas)
+    assert es.load_state()["sources"]["X"]["newest_first"]
+
+    # Fecha nueva antepuesta en X y añadida al final en Y y Z
+    new_day = dates[-1] + pd.Timedelta(days=1)
+    paths["X"].write_text(f"Date,Price\n{new_day:%Y-%m-%d},1.0\n" + body, encoding="utf-8")
+    for n in "YZ":
+        with open(paths[n], "a") as fh:
+            fh.write(f"{new_day:%Y-%m-%d},2.0\n")
+
+    reads = _spy_reads(monkeypatch, es)
+    assert es.incremental_run(paths, es.load_state(), formulas) == 1
+    assert dict(reads)["X.csv"] <= es.HEAD_CHUNK_ROWS
+
+    pd.testing.assert_frame_equal(
+        load_table(tmp_path / "estimated"), es.full_run(paths, formulas), check_freq=False
+    )
+
+
+def test_incremental_refreshes_state_of_rewritten_file(tmp_path, monkeypatch):
+    import src.estimation_script as es
+
+    monkeypatch.setattr(es, "STORE_STEM", tmp_path / "estimated")
+    monkeypatch.setattr(es, "SUMMARY_STEM", tmp_path / "summary")
+    monkeypatch.setattr(es, "STATE_PATH", tmp_path / "state.json")
+
+    paths = {n: tmp_path / f"{n}.csv" for n in "XYZ"}
+    for p in paths.values():
+        p.write_text("Date,Price\n2024-01-01,10.5\n2024-01-02,11.5\n")
+
+    formulas = es.load_formulas()
+    es.full_run(paths, formulas)
+
+    # Reescritura sin fechas nuevas (p. ej. otro formato de decimales)
+    paths["Y"].write_text("Date;Price\n2024-01-01;10,5\n2024-01-02;11,5\n")
+
+    reads = _spy_reads(monkeypatch, es)
+    assert es.incremental_run(paths, es.load_state(), formulas) == 0
+    assert [name for name, _ in reads] == ["Y.csv"]
+
+    reads.clear()
+    assert es.incremental_run(paths, es.load_state(), formulas) == 0
+    assert reads == []
+
+
+def test_incremental_run_keeps_rows_dropped_until_late_source(tmp_path, monkeypatch):
+    import src.estimation_script as es
+    from src.storage import load_table
+
+    monkeypatch.setattr(es, "STORE_STEM", tmp_path / "estimated")
+    monkeypatch.setattr(es, "SUMMARY_STEM", tmp_path / "summary")
+    monkeypatch.setattr(es, "STATE_PATH", tmp_path / "state.json")
+
+    formulas_path = tmp_path / "formulas.csv"
+    formulas_path.write_text("equipment,X,Y,missing\ne1,0.5,0.5,drop\n")
+    formulas = es.load_formulas(formulas_path)
+
+    paths = {n: tmp_path / f"{n}.csv" for n in "XY"}
+    paths["X"].write_text("Date;Price\n1/1/2024;10,5\n")
+    paths["Y"].write_text("Date;Price\n1/1/2024;20,5\n")
+    es.full_run(paths, formulas)
+
+    # X gana 02/01/2024 antes que Y: la fila no se puede calcular todavía
+    with open(paths["X"], "a") as fh:
+        fh.write("2/1/2024;11,5\n")
+    assert es.incremental_run(paths, es.load_state(), formulas) is None
+    es.full_run(paths, formulas)
+
+    with open(paths["Y"], "a") as fh:
+        fh.write("2/1/2024;21,5\n")
+    assert es.incremental_run(paths, es.load_state(), formulas) is None
+
+    expected = es.full_run(paths, formulas)
+    assert len(expected) == 2
+    pd.testing.assert_frame_equal(load_table(tmp_path / "estimated"), expected, check_freq=False)
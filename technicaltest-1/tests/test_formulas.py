@@ -0,0 +1,36 @@
+import sys
+from pathlib import Path
+
+# Añadir la raíz del proyecto (technicaltest#1/) al PATH
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path.append(str(ROOT_DIR))
+
+import numpy as np
+import pandas as pd
+from src.formulas import drop_mask, evaluate_formulas, load_formulas
+
+def test_default_config_matches_original_formulas():
+    weights, policies = load_formulas()
+    inputs = pd.DataFrame({"X": [10.0, 20.0], "Y": [30.0, np.nan], "Z": [50.0, 60.0]})
+
+    out = evaluate_formulas(inputs, weights, policies)
+
+    assert np.isclose(out.loc[0, "equip1"], 0.2 * 10 + 0.8 * 30)
+    assert np.isclose(out.loc[0, "equip2"], (10 + 30 + 50) / 3)
+    assert out.loc[1].isna().all()
+
+def test_missing_value_policies():
+    weights = pd.DataFrame(
+        [[0.5, 0.5]] * 4,
+        index=["prop", "ffill", "renorm", "drop"],
+        columns=["A", "B"],
+    )
+    policies = pd.Series(["propagate", "ffill", "renormalize", "drop"], index=weights.index)
+    inputs = pd.DataFrame({"A": [2.0, 4.0], "B": [6.0, np.nan]})
+
+    out = evaluate_formulas(inputs, weights, policies)
+
+    assert np.isnan(out.loc[1, "prop"])
+    assert out.loc[1, "ffill"] == 5.0
+    assert out.loc[1, "renorm"] == 4.0
+    assert drop_mask(out, policies).tolist() == [True, False]
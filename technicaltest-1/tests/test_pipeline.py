@@ -0,0 +1,65 @@
+import sys
+from pathlib import Path
+
+# Añadir la raíz del proyecto (technicaltest#1/) al PATH
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path.append(str(ROOT_DIR))
+
+from src.pipeline import run_pipeline
+
+def _stages(tmp_path, calls):
+    src = tmp_path / "src.txt"
+    mid = tmp_path / "mid.txt"
+
+    def stage(name, inputs, out, content):
+        def run(params):
+            calls.append(name)
+            out.write_text(content())
+        return {"deps": [] if name == "a" else ["a"], "inputs": lambda: inputs,
+                "outputs": lambda: [out], "params": {}, "run": run}
+
+    return {
+        "a": stage("a", [src], mid, lambda: src.read_text()),
+        "b": stage("b", [mid], tmp_path / "b.txt", lambda: "b"),
+        "c": stage("c", [mid], tmp_path / "c.txt", lambda: "c"),
+    }
+
+def test_pipeline_skips_unchanged_stages(tmp_path):
+    (tmp_path / "src.txt").write_text("v1")
+    kwargs = {"cache_path": tmp_path / "cache.json", "timings_path": tmp_path / "t.json"}
+
+    calls = []
+    run_pipeline(_stages(tmp_path, calls), **kwargs)
+    assert sorted(calls) == ["a", "b", "c"]
+
+    calls.clear()
+    results = run_pipeline(_stages(tmp_path, calls), **kwargs)
+    assert calls == []
+    assert {r["status"] for r in results.values()} == {"cached"}
+
+    (tmp_path / "src.txt").write_text("v2 más largo")
+    calls.clear()
+    run_pipeline(_stages(tmp_path, calls), **kwargs)
+    assert calls[0] == "a" and sorted(calls[1:]) == ["b", "c"]
+
+def test_default_stages_use_the_given_formulas(tmp_path):
+    from src.pipeline import default_stages
+
+    formulas = tmp_path / "otras.csv"
+    formulas.write_text("equipment,X,Y,Z,missing\nequipoA,1,0,0,propagate\n")
+
+    stages = default_stages(formulas_path=formulas)
+
+    for name in ["estimation", "forecast", "montecarlo", "plots"]:
+        assert stages[name]["params"]["formulas_path"] == str(formulas)
+        assert formulas in stages[name]["inputs"]()
+    assert [p.name for p in stages["forecast"]["outputs"]()] == ["forecast_equipoA.parquet"]
+
+def test_stage_keys_cover_imported_modules():
+    from src.pipeline import SRC_DIR, default_stages
+
+    stages = default_stages()
+
+    assert {SRC_DIR / "formulas.py", SRC_DIR / "running_stats.py", SRC_DIR / "storage.py"} <= set(stages["estimation"]["inputs"]())
+    for name in ["forecast", "montecarlo", "plots"]:
+        assert SRC_DIR / "storage.py" in stages[name]["inputs"]()
@@ -0,0 +1,26 @@
+import sys
+from pathlib import Path
+
+# Añadir la raíz del proyecto (technicaltest#1/) al PATH
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path.append(str(ROOT_DIR))
+
+import numpy as np
+import pandas as pd
+from src.plotting import downsample, lttb
+
+def test_lttb_keeps_endpoints_and_peak():
+    x = np.arange(10_000, dtype="float64")
+    y = np.sin(x / 500)
+    y[4321] = 50.0  # pico aislado
+
+    idx = lttb(x, y, 200)
+
+    assert len(idx) == 200
+    assert idx[0] == 0 and idx[-1] == len(x) - 1
+    assert np.all(np.diff(idx) > 0)
+    assert 4321 in idx
+
+def test_downsample_short_series_is_unchanged():
+    s = pd.Series([1.0, np.nan, 3.0], index=pd.date_range("2024-01-01", periods=3))
+    assert downsample(s, 1000).tolist() == [1.0, 3.0]
@@ -0,0 +1,20 @@
+import sys
+from pathlib import Path
+
+# Añadir la raíz del proyecto (technicaltest#1/) al PATH
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path.append(str(ROOT_DIR))
+
+import pandas as pd
+from src.storage import load_table, save_table
+
+def test_parquet_roundtrip_keeps_date_index_and_projects(tmp_path):
+    idx = pd.to_datetime(["2024-01-01", "2024-01-02"]).rename("Date")
+    df = pd.DataFrame({"X": [1.0, 2.0], "equip1": [3.0, 4.0]}, index=idx)
+
+    save_table(df, tmp_path / "estimated", export_csv=True)
+    out = load_table(tmp_path / "estimated", columns=["equip1"])
+
+    assert list(out.columns) == ["equip1"]
+    assert pd.api.types.is_datetime64_any_dtype(out.index)
+    assert (tmp_path / "estimated.csv").exists()
@@ -0,0 +1,222 @@
+"""
+Armado del prompt con presupuesto de tokens para generate_answer.
+
+- Los tokens se cuentan con tiktoken (o200k_base, la codificación de
+  gpt-4o-mini). La primera vez tiktoken descarga la codificación; para
+  hosts sin salida a internet, RAG_TIKTOKEN_FILE apunta a una copia local
+  de o200k_base.tiktoken. Si no está disponible se usa una aproximación
+  de 4 caracteres por token.
+- Los casos se empacan por similitud descendente hasta llenar el
+  presupuesto; los campos largos se recortan en un límite de oración.
+- Los casos casi idénticos (misma providencia o texto muy parecido) se
+  incluyen una sola vez.
+- La plantilla se parte una sola vez al importar el módulo y los tokens
+  de sus partes fijas se cuentan una sola vez por ContextBuilder.
+"""
+
+import math
+import os
+import re
+import logging
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+TOKEN_BUDGET = int(os.getenv("RAG_PROMPT_TOKEN_BUDGET", "1500"))
+ENCODING_NAME = "o200k_base"
+ENCODING_FILE = os.getenv("RAG_TIKTOKEN_FILE")
+
+# Patrón de pre-tokenización de o200k_base (tiktoken_ext.openai_public),
+# necesario para construir la codificación desde un archivo local
+_O200K_PAT = "|".join([
+    r"""[^\r\n\p{L}\p{N}]?[\p{Lu}\p{Lt}\p{Lm}\p{Lo}\p{M}]*[\p{Ll}\p{Lm}\p{Lo}\p{M}]+(?i:'s|'t|'re|'ve|'m|'ll|'d)?""",
+    r"""[^\r\n\p{L}\p{N}]?[\p{Lu}\p{Lt}\p{Lm}\p{Lo}\p{M}]+[\p{Ll}\p{Lm}\p{Lo}\p{M}]*(?i:'s|'t|'re|'ve|'m|'ll|'d)?""",
+    r"""\p{N}{1,3}""",
+    r""" ?[^\s\p{L}\p{N}]+[\r\n/]*""",
+    r"""\s*[\r\n]+""",
+    r"""\s+(?!\S)""",
+    r"""\s+""",
+])
+_O200K_SPECIAL = {"<|endoftext|>": 199999, "<|endofprompt|>": 200018}
+
+SYSTEM_PROMPT = "Eres un asistente legal amigable que explica casos legales en términos simples."
+
+PROMPT_TEMPLATE = """
+Eres un asistente legal que explica casos legales en lenguaje sencillo para personas sin conocimientos de derecho.
+
+CONTEXTO (casos legales reales):
+{context}
+
+PREGUNTA DEL USUARIO:
+{question}
+
+INSTRUCCIONES:
+1. Responde EN ESPAÑOL y en lenguaje coloquial
+2. Usa solo la información del contexto (NO inventes nada)
+3. Sé claro y conciso
+4. Si hay múltiples casos, menciona los más relevantes
+5. Explica qué pasó y cuál fue el resultado
+
+RESPUESTA:
+"""
+
+# Plantilla "compilada": partes fijas alrededor de {context} y {question}
+_HEAD, _rest = PROMPT_TEMPLATE.split("{context}")
+_MIDDLE, _TAIL = _rest.split("{question}")
+
+# Campos recortables y su tope de tokens por caso
+FIELD_LIMITS = {"resuelve": 150, "sintesis": 250}
+MIN_CASE_TOKENS = 60  # por debajo de esto no vale la pena incluir otro caso
+DUPLICATE_THRESHOLD = 0.9  # Jaccard de palabras entre casos
+ELLIPSIS = " […]"
+
+_SENTENCE_END = re.compile(r"[.;:!?](?=\s|$)")
+_WORD = re.compile(r"\w+")
+
+
+class _ApproxEncoding:
+    """Reemplazo de tiktoken: un "token" cada 4 caracteres."""
+
+    def encode(self, text: str) -> List[str]:
+        return [text[i:i + 4] for i in range(0, len(text), 4)]
+
+    def decode(self, tokens: List[str]) -> str:
+        return "".join(tokens)
+
+
+def load_encoding(path: Optional[str] = ENCODING_FILE):
+    """o200k_base desde `path` (sin red) o vía tiktoken; aproximación si falla."""
+    try:
+        import tiktoken
+        if path:
+            from tiktoken.load import load_tiktoken_bpe
+            return tiktoken.Encoding(
+                ENCODING_NAME,
+                pat_str=_O200K_PAT,
+                mergeable_ranks=load_tiktoken_bpe(path),
+                special_tokens=_O200K_SPECIAL,
+            )
+        return tiktoken.get_encoding(ENCODING_NAME)
+    except Exception as e:
+        logger.warning(f"Tokenizador {ENCODING_NAME} no disponible ({e}). Usando aproximación de 4 caracteres por token.")
+        return _ApproxEncoding()
+
+
+class ContextBuilder:
+    def __init__(self, token_budget: int = TOKEN_BUDGET, encoding=None):
+        self.token_budget = token_budget
+        self.encoding = encoding or load_encoding()
+        # Tokens fijos de la plantilla y del mensaje de sistema (se cuentan una vez)
+        self.fixed_tokens = sum(self.count_tokens(part) for part in (SYSTEM_PROMPT, _HEAD, _MIDDLE, _TAIL))
+
+    def count_tokens(self, text: str) -> int:
+        return len(self.encoding.encode(text))
+
+    def truncate(self, text: str, max_tokens: int) -> str:
+        """Recorta a max_tokens, preferiblemente al final de una oración."""
+        tokens = self.encoding.encode(text)
+        if len(tokens) <= max_tokens:
+            return text
+        if max_tokens <= 0:
+            return ""
+
+        cut = self.encoding.decode(tokens[:max(1, max_tokens - self.count_tokens(ELLIPSIS))])
+        ends = [m.end() for m in _SENTENCE_END.finditer(cut)]
+        if ends and ends[-1] >= len(cut) * 0.6:
+            return cut[:ends[-1]] + ELLIPSIS
+        space = cut.rfind(" ")
+        if space >= len(cut) * 0.6:
+            cut = cut[:space]
+        return cut.rstrip(" ,") + ELLIPSIS
+
+    def _render_case(self, number: int, case: Dict, fields: Dict[str, str]) -> str:
+        return (
+            f"Caso #{number}:\n"
+            f"- Tipo: {case.get('Tipo', 'No especificado')}\n"
+            f"- Tema: {case.get('Tema_subtema', 'No especificado')}\n"
+            f"- Resolución: {fields['resuelve']}\n"
+            f"- Resumen: {fields['sintesis']}"
+        )
+
+    @staticmethod
+    def _signature(case: Dict) -> set:
+        text = " ".join(str(case.get(f, "")) for f in ("Tipo", "resuelve", "sintesis"))
+        return set(_WORD.findall(text.lower()))
+
+    def _is_duplicate(self, case: Dict, kept: List[Tuple[Dict, set]]) -> bool:
+        words = self._signature(case)
+        for other, other_words in kept:
+            providencia = case.get("Providencia")
+            if providencia and providencia not in ("No especificado", "nan") and providencia == other.get("Providencia"):
+                return True
+            union = words | other_words
+            if union and len(words & other_words) / len(union) >= DUPLICATE_THRESHOLD:
+                return True
+        return False
+
+    def build(self, question: str, cases: List[Dict]) -> Tuple[str, Dict]:
+        """
+        Devuelve (prompt, estadísticas). El prompt respeta token_budget
+        (plantilla + mensaje de sistema + pregunta + contexto): una pregunta
+        demasiado larga se recorta para dejar sitio al menos a un caso.
+        stats["over_budget"] solo es True si ni así cabe (presupuesto menor
+        que la plantilla).
+        """
+        stats = {"cases_used": 0, "duplicates_skipped": 0, "fields_truncated": 0, "question_truncated": False}
+        
+        question_limit = max(0, self.token_budget - self.fixed_tokens - MIN_CASE_TOKENS)
+        if self.count_tokens(question) > question_limit:
+            question = self.truncate(question, question_limit)
+            stats["question_truncated"] = True
+        question_tokens = self.count_tokens(question)
+        available = self.token_budget - self.fixed_tokens - question_tokens
+
+        ranked = sorted(cases, key=lambda c: c.get("similarity_score", 0), reverse=True)
+        blocks: List[str] = []
+        kept: List[Tuple[Dict, set]] = []
+        separator_tokens = self.count_tokens("\n\n")
+
+        for case in ranked:
+            if self._is_duplicate(case, kept):
+                stats["duplicates_skipped"] += 1
+                continue
+
+            budget = available - (separator_tokens if blocks else 0)
+            if budget < MIN_CASE_TOKENS:
+                break
+
+            fields = {}
+            for name, limit in FIELD_LIMITS.items():
+                text = str(case.get(name, "No especificada"))
+                fields[name] = self.truncate(text, limit)
+                stats["fields_truncated"] += fields[name] != text
+
+            block = self._render_case(len(blocks) + 1, case, fields)
+            block_tokens = self.count_tokens(block)
+            if block_tokens > budget:
+                # Reparte el exceso entre los campos largos en proporción a su tamaño
+                excess = block_tokens - budget
+                sizes = {name: self.count_tokens(fields[name]) for name in FIELD_LIMITS}
+                total = sum(sizes.values()) or 1
+                for name, size in sizes.items():
+                    shrunk = self.truncate(fields[name], size - math.ceil(excess * size / total))
+                    stats["fields_truncated"] += shrunk != fields[name]
+                    fields[name] = shrunk
+                block = self._render_case(len(blocks) + 1, case, fields)
+                block_tokens = self.count_tokens(block)
+                if block_tokens > budget:
+                    break
+
+            blocks.append(block)
+            kept.append((case, self._signature(case)))
+            available = budget - block_tokens
+
+        context = "\n\n".join(blocks)
+        prompt = "".join((_HEAD, context, _MIDDLE, question, _TAIL))
+
+        stats["cases_used"] = len(blocks)
+        stats["context_tokens"] = self.count_tokens(context)
+        stats["prompt_tokens"] = self.fixed_tokens + question_tokens + stats["context_tokens"]
+        stats["token_budget"] = self.token_budget
+        stats["over_budget"] = stats["prompt_tokens"] > self.token_budget
+        return prompt, stats
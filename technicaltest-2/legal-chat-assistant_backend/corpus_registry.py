@@ -0,0 +1,157 @@
+"""
+Registro de corpus (por jurisdicción o por cliente) con carga perezosa.
+
+Cada corpus es un índice publicado con index_store en su propio directorio:
+
+    data/corpora/<corpus_id>/CURRENT, v.../
+
+- Un corpus se abre (SharedIndex, mmap) la primera vez que se consulta.
+- Los corpus abiertos viven en un LRU acotado por memoria: la huella de
+  un corpus es el tamaño de sus archivos (embeddings + metadatos), que es
+  lo que ocupa en memoria cuando está caliente. Al superar el límite se
+  cierran los menos usados.
+- El modelo de embeddings NO vive aquí: LegalRAGPipeline lo carga una
+  vez y se usa para consultar cualquier corpus.
+
+Para crear o actualizar un corpus:
+    python ingestion.py <directorio> --publish --corpus <corpus_id>
+"""
+
+import os
+import re
+import threading
+import time
+import logging
+from collections import OrderedDict
+from typing import Dict, List
+
+from index_store import SharedIndex, current_version
+
+logger = logging.getLogger(__name__)
+
+CORPORA_DIR = "data/corpora"
+MEMORY_BUDGET_MB = float(os.getenv("RAG_CORPUS_MEMORY_MB", "1024"))
+
+_CORPUS_ID = re.compile(r"^[A-Za-z0-9_-]+$")
+
+
+def corpus_dir(corpus_id: str, corpora_dir: str = CORPORA_DIR) -> str:
+    """Directorio del corpus; valida el id para no salir de corpora_dir."""
+    if not _CORPUS_ID.match(corpus_id):
+        raise ValueError(f"Identificador de corpus inválido: {corpus_id!r}")
+    return os.path.join(corpora_dir, corpus_id)
+
+
+def _footprint_mb(index: SharedIndex) -> float:
+    path = os.path.join(index.index_dir, index.version)
+    try:
+        size = sum(os.path.getsize(os.path.join(path, name)) for name in os.listdir(path))
+    except OSError:  # versión ya podada tras un hot-swap
+        return 0.0
+    return size / (1024 * 1024)
+
+
+class CorpusRegistry:
+    def __init__(self, corpora_dir: str = CORPORA_DIR, memory_budget_mb: float = MEMORY_BUDGET_MB):
+        self.corpora_dir = corpora_dir
+        self.memory_budget_mb = memory_budget_mb
+        self._hot: "OrderedDict[str, SharedIndex]" = OrderedDict()
+        self._stats: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+        self._loading: Dict[str, threading.Lock] = {}
+
+    def available(self) -> List[str]:
+        """Corpus publicados en disco (cargados o no)."""
+        if not os.path.isdir(self.corpora_dir):
+            return []
+        return sorted(
+            name for name in os.listdir(self.corpora_dir)
+            if _CORPUS_ID.match(name) and current_version(os.path.join(self.corpora_dir, name))
+        )
+
+    def get(self, corpus_id: str) -> SharedIndex:
+        """
+        Índice del corpus, abriéndolo si hace falta.
+        Lanza KeyError si el corpus no existe y ValueError si el id es inválido.
+        """
+        path = corpus_dir(corpus_id, self.corpora_dir)
+
+        with self._lock:
+            index = self._touch(corpus_id)
+            if index is not None:
+                return index
+            if current_version(path) is None:
+                raise KeyError(corpus_id)
+            loading = self._loading.setdefault(corpus_id, threading.Lock())
+
+        # Carga fuera del lock global: otros corpus siguen atendiendo consultas
+        with loading:
+            with self._lock:
+                # Otra petición pudo cargarlo mientras esperábamos
+                index = self._touch(corpus_id)
+                if index is not None:
+                    return index
+
+            t0 = time.perf_counter()
+            index = SharedIndex(path)
+            load_seconds = time.perf_counter() - t0
+
+            with self._lock:
+                self._hot[corpus_id] = index
+                previous = self._stats.get(corpus_id, {})
+                self._stats[corpus_id] = {
+                    "load_seconds": round(load_seconds, 4),
+                    "loads": previous.get("loads", 0) + 1,
+                    "hits": previous.get("hits", 0),
+                    "evictions": previous.get("evictions", 0),
+                    "last_used": time.time(),
+                }
+                logger.info(f" Corpus {corpus_id} cargado en {load_seconds:.3f}s ({index.ntotal} casos)")
+                self._evict(keep=corpus_id)
+            return index
+
+    def _touch(self, corpus_id: str):
+        """Marca el corpus como recién usado; None si no está cargado (con el lock tomado)."""
+        index = self._hot.get(corpus_id)
+        if index is not None:
+            self._hot.move_to_end(corpus_id)
+            self._stats[corpus_id]["hits"] += 1
+            self._stats[corpus_id]["last_used"] = time.time()
+        return index
+
+    def _evict(self, keep: str) -> None:
+        """Cierra los corpus menos usados hasta volver al presupuesto (con el lock tomado)."""
+        total = sum(_footprint_mb(index) for index in self._hot.values())
+        for corpus_id in list(self._hot):
+            if total <= self.memory_budget_mb:
+                break
+            if corpus_id == keep:
+                continue
+            # Sin cierre explícito: las consultas en curso conservan su referencia
+            # y los mmap se liberan cuando terminan
+            total -= _footprint_mb(self._hot.pop(corpus_id))
+            self._stats[corpus_id]["evictions"] += 1
+            logger.info(f" Corpus {corpus_id} desalojado (LRU)")
+
+        if total > self.memory_budget_mb:
+            logger.warning(f"El corpus {keep} ({total:.1f} MB) supera por sí solo el presupuesto de {self.memory_budget_mb} MB")
+
+    def stats(self) -> Dict:
+        """Estado para /debug: corpus calientes, memoria y tiempos de carga."""
+        with self._lock:
+            corpora = {}
+            for corpus_id, stats in self._stats.items():
+                index = self._hot.get(corpus_id)
+                corpora[corpus_id] = {
+                    **stats,
+                    "loaded": index is not None,
+                    "version": index.version if index is not None else None,
+                    "cases": index.ntotal if index is not None else None,
+                    "memory_mb": round(_footprint_mb(index), 2) if index is not None else 0.0,
+                }
+            return {
+                "memory_budget_mb": self.memory_budget_mb,
+                "memory_used_mb": round(sum(c["memory_mb"] for c in corpora.values()), 2),
+                "hot": list(self._hot),
+                "corpora": corpora,
+            }
@@ -1,6 +1,7 @@
 import pandas as pd
 import logging
-from typing import List, Dict, Any
+import os
+from typing import List, Dict, Any, Optional
 from rag_pipeline import LegalRAGPipeline
 
 logger = logging.getLogger(__name__)
@@ -63,6 +64,40 @@ class DocumentProcessor:
             logger.error(f" Error procesando Excel: {e}")
             raise
     
+    def process_directory(self, source_dir: str, **ingest_kwargs) -> Dict[str, Any]:
+        """
+        Ingiere sentencias PDF/DOCX/TXT de un directorio (ver ingestion.py)
+        y agrega al pipeline todo lo confirmado en el checkpoint.
+        Devuelve las estadísticas de la ingesta.
+        """
+        from ingestion import CHECKPOINT_DIR, ingest_directory
+        
+        stats = ingest_directory(source_dir, self.rag_pipeline.model, **ingest_kwargs)
+        self.load_ingested(ingest_kwargs.get("checkpoint_dir", CHECKPOINT_DIR))
+        return stats
+    
+    def load_ingested(self, checkpoint_dir: Optional[str] = None) -> int:
+        """
+        Agrega al pipeline los documentos de un checkpoint de ingesta ya
+        existente (sin volver a ingerir). Devuelve cuántos se agregaron;
+        0 si no hay checkpoint.
+        """
+        from ingestion import CHECKPOINT_DIR, PROGRESS_FILE, load_checkpoint
+        
+        checkpoint_dir = checkpoint_dir or CHECKPOINT_DIR
+        if not os.path.exists(os.path.join(checkpoint_dir, PROGRESS_FILE)):
+            return 0
+        embeddings, metadata = load_checkpoint(checkpoint_dir)
+        
+        # Ids consecutivos a continuación de los casos ya cargados (p. ej. del Excel)
+        base = len(self.rag_pipeline.metadata_store)
+        for offset, item in enumerate(metadata):
+            item["id"] = base + offset + 1
+        
+        self.rag_pipeline.add_embeddings(embeddings, metadata)
+        logger.info(f" {len(metadata)} documentos agregados a la base de datos vectorial")
+        return len(metadata)
+    
     def _create_case_text(self, row) -> str:
         """Crea texto completo del caso para embedding"""
         parts = []
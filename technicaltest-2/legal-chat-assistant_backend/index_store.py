@@ -0,0 +1,270 @@
+"""
+Índice vectorial compartido de solo lectura para servir con varios workers.
+
+En lugar de que cada worker de uvicorn construya su propio IndexFlatL2 y
+metadata_store, el índice se construye UNA vez y se publica en disco:
+
+    data/index/
+        CURRENT                   -> nombre de la versión activa
+        v20250101-120000.123456789/
+            embeddings.npy        -> matriz float32 (n, 384)
+            metadata.jsonl        -> un caso por línea
+            metadata.offsets.npy  -> offsets de cada línea en metadata.jsonl
+            source.json           -> mtime y tamaño del Excel de origen
+
+Cada worker abre los archivos con mmap: las páginas viven en la caché del
+sistema operativo y se comparten entre procesos, así que la memoria del
+índice no se multiplica por N. La búsqueda es exacta (L2 por fuerza bruta,
+igual que IndexFlatL2) con faiss.knn sobre la matriz mapeada.
+
+Hot-swap: publicar una versión nueva escribe el directorio completo y
+luego reemplaza CURRENT de forma atómica; cada worker detecta el cambio en
+su siguiente consulta y cambia de versión sin reiniciar.
+
+Si el Excel cambia (mtime o tamaño distintos de source.json), el primer
+worker en arrancar reconstruye y publica una versión nueva.
+"""
+
+import faiss
+import numpy as np
+import json
+import mmap
+import os
+import shutil
+import time
+import logging
+from filelock import FileLock
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+INDEX_DIR = "data/index"
+CURRENT_FILE = "CURRENT"
+LOCK_FILE = ".build.lock"
+KEEP_VERSIONS = 3
+REFRESH_INTERVAL = 2.0  # segundos entre comprobaciones de CURRENT
+
+
+def current_version(index_dir: str = INDEX_DIR) -> Optional[str]:
+    """Versión publicada activa, o None si todavía no hay ninguna."""
+    try:
+        with open(os.path.join(index_dir, CURRENT_FILE), encoding="utf-8") as fh:
+            return fh.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def source_fingerprint(data_file: str) -> Dict:
+    """Identifica la versión del Excel de origen (sin leerlo)."""
+    st = os.stat(data_file)
+    return {"mtime_ns": st.st_mtime_ns, "size": st.st_size}
+
+
+def published_source(index_dir: str = INDEX_DIR) -> Optional[Dict]:
+    """Huella del Excel con que se construyó la versión activa (None si no consta)."""
+    version = current_version(index_dir)
+    if version is None:
+        return None
+    try:
+        with open(os.path.join(index_dir, version, "source.json"), encoding="utf-8") as fh:
+            return json.load(fh)
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def build_lock(index_dir: str = INDEX_DIR) -> FileLock:
+    """Lock entre procesos para que solo un worker construya el índice."""
+    os.makedirs(index_dir, exist_ok=True)
+    return FileLock(os.path.join(index_dir, LOCK_FILE))
+
+
+def publish_index(
+    embeddings: np.ndarray,
+    metadata: List[Dict],
+    index_dir: str = INDEX_DIR,
+    source: Optional[Dict] = None,
+) -> str:
+    """
+    Escribe una versión nueva del índice y la activa de forma atómica.
+    `source` (ver source_fingerprint) se guarda con la versión para
+    detectar cambios en el Excel. Devuelve el nombre de la versión publicada.
+    """
+    if len(embeddings) != len(metadata):
+        raise ValueError("embeddings y metadata deben tener la misma longitud")
+
+    now_ns = time.time_ns()
+    version = time.strftime("v%Y%m%d-%H%M%S", time.localtime(now_ns // 10**9)) + f".{now_ns % 10**9:09d}"
+    tmp_dir = os.path.join(index_dir, f".tmp-{version}")
+    os.makedirs(tmp_dir)
+
+    np.save(os.path.join(tmp_dir, "embeddings.npy"), np.ascontiguousarray(embeddings, dtype="float32"))
+
+    offsets = []
+    with open(os.path.join(tmp_dir, "metadata.jsonl"), "wb") as fh:
+        for item in metadata:
+            offsets.append(fh.tell())
+            fh.write(json.dumps(item, ensure_ascii=False).encode("utf-8") + b"\n")
+        offsets.append(fh.tell())
+    np.save(os.path.join(tmp_dir, "metadata.offsets.npy"), np.asarray(offsets, dtype="int64"))
+    if source is not None:
+        with open(os.path.join(tmp_dir, "source.json"), "w", encoding="utf-8") as fh:
+            json.dump(source, fh)
+
+    os.replace(tmp_dir, os.path.join(index_dir, version))
+
+    # Cambio atómico del puntero: los workers ven la versión vieja o la nueva
+    pointer_tmp = os.path.join(index_dir, CURRENT_FILE + ".tmp")
+    with open(pointer_tmp, "w", encoding="utf-8") as fh:
+        fh.write(version)
+    os.replace(pointer_tmp, os.path.join(index_dir, CURRENT_FILE))
+
+    logger.info(f" Índice publicado: {version} ({len(metadata)} casos)")
+    _prune_versions(index_dir, keep=version)
+    return version
+
+
+def _prune_versions(index_dir: str, keep: str) -> None:
+    """Borra versiones antiguas (los workers que aún las mapean no se ven afectados en POSIX)."""
+    versions = sorted(
+        d for d in os.listdir(index_dir)
+        if d.startswith("v") and os.path.isdir(os.path.join(index_dir, d))
+    )
+    for old in versions[:-KEEP_VERSIONS]:
+        if old == keep:
+            continue
+        try:
+            shutil.rmtree(os.path.join(index_dir, old))
+        except OSError as e:
+            # En Windows un archivo mapeado no se puede borrar; se reintenta en la próxima publicación
+            logger.warning(f"No se pudo borrar la versión {old}: {e}")
+
+
+class IndexSnapshot:
+    """
+    Una versión publicada, mapeada en memoria e inmutable.
+    Los resultados de search() deben resolverse con get() de la MISMA
+    instantánea: los ids de FAISS solo son válidos dentro de su versión.
+    """
+
+    def __init__(self, index_dir: str, version: str):
+        path = os.path.join(index_dir, version)
+        self.version = version
+        self.embeddings = np.load(os.path.join(path, "embeddings.npy"), mmap_mode="r")
+        self.offsets = np.load(os.path.join(path, "metadata.offsets.npy"), mmap_mode="r")
+
+        # El mmap duplica el descriptor: el archivo puede cerrarse de inmediato.
+        # No se cierra explícitamente; se libera con la última referencia.
+        with open(os.path.join(path, "metadata.jsonl"), "rb") as fh:
+            self._meta = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ) if self.offsets[-1] else b""
+
+    @property
+    def ntotal(self) -> int:
+        return len(self.embeddings)
+
+    def search(self, query_embeddings: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Búsqueda L2 exacta; mismo contrato que IndexFlatL2.search."""
+        query_embeddings = np.ascontiguousarray(query_embeddings, dtype="float32")
+        if self.ntotal == 0:
+            shape = (len(query_embeddings), k)
+            return np.full(shape, np.inf, dtype="float32"), np.full(shape, -1, dtype="int64")
+        return faiss.knn(query_embeddings, self.embeddings, min(k, self.ntotal))
+
+    def get(self, idx: int) -> Dict:
+        start, end = int(self.offsets[idx]), int(self.offsets[idx + 1])
+        return json.loads(self._meta[start:end])
+
+    def __contains__(self, idx: int) -> bool:
+        return 0 <= idx < self.ntotal
+
+
+class SharedIndex:
+    """
+    Vista mmap de solo lectura de la versión publicada del índice.
+    refresh() reemplaza la instantánea actual por una nueva; las consultas
+    en curso siguen usando la que obtuvieron en search().
+    """
+
+    def __init__(self, index_dir: str = INDEX_DIR):
+        self.index_dir = index_dir
+        self._last_check = 0.0
+
+        version = current_version(index_dir)
+        if version is None:
+            raise FileNotFoundError(f"No hay índice publicado en {index_dir}")
+        self._load(version)
+
+    def _load(self, version: str) -> None:
+        # Asignación de una sola referencia: atómica para los hilos que consultan
+        self.snapshot = IndexSnapshot(self.index_dir, version)
+        logger.info(f" Índice compartido cargado: {version} ({self.ntotal} casos)")
+
+    def refresh(self, force: bool = False) -> bool:
+        """Cambia a la versión publicada si es distinta. Devuelve True si cambió."""
+        now = time.monotonic()
+        if not force and now - self._last_check < REFRESH_INTERVAL:
+            return False
+        self._last_check = now
+
+        version = current_version(self.index_dir)
+        if version is None or version == self.version:
+            return False
+        self._load(version)
+        return True
+
+    @property
+    def version(self) -> str:
+        return self.snapshot.version
+
+    @property
+    def ntotal(self) -> int:
+        return self.snapshot.ntotal
+
+    def search(self, query_embeddings: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray, IndexSnapshot]:
+        """Como IndexFlatL2.search, más la instantánea con la que resolver los ids."""
+        snapshot = self.snapshot
+        distances, indices = snapshot.search(query_embeddings, k)
+        return distances, indices, snapshot
+
+
+def memory_usage() -> Dict[str, float]:
+    """
+    Memoria del proceso actual en MB (Linux, /proc/self/status):
+    - rss:       total residente
+    - rss_anon:  memoria privada (modelo, tensores, dicts de Python)
+    - rss_file:  páginas de archivos mapeados (índice compartido)
+    Devuelve {} si la plataforma no lo expone.
+    """
+    fields = {"VmRSS": "rss", "RssAnon": "rss_anon", "RssFile": "rss_file", "RssShmem": "rss_shmem"}
+    usage = {}
+    try:
+        with open("/proc/self/status", encoding="utf-8") as fh:
+            for line in fh:
+                key, _, value = line.partition(":")
+                if key in fields:
+                    usage[fields[key]] = round(int(value.split()[0]) / 1024, 1)
+    except OSError:
+        return {}
+    return usage
+
+
+def build_and_publish(data_file: str = "data/sentencias_pasadas.xlsx", index_dir: str = INDEX_DIR) -> str:
+    """Construye el índice desde el Excel y lo publica (usado por el CLI y el primer worker)."""
+    from rag_pipeline import LegalRAGPipeline
+    from document_processor import DocumentProcessor
+
+    pipeline = LegalRAGPipeline()
+    DocumentProcessor(pipeline).process_excel_file(data_file)
+    embeddings, metadata = pipeline.export_index()
+    return publish_index(embeddings, metadata, index_dir, source=source_fingerprint(data_file))
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Construye y publica una versión nueva del índice compartido")
+    parser.add_argument("--data-file", default="data/sentencias_pasadas.xlsx")
+    parser.add_argument("--index-dir", default=INDEX_DIR)
+    args = parser.parse_args()
+
+    with build_lock(args.index_dir):
+        print(build_and_publish(args.data_file, args.index_dir))
@@ -0,0 +1,418 @@
+"""
+Ingesta paralela de sentencias en texto completo (PDF / DOCX / TXT).
+
+Flujo:
+    archivos -> pool de procesos (extracción de texto)
+             -> cola acotada (backpressure)
+             -> lotes -> modelo de embeddings
+             -> checkpoint en disco (partes .npy + .jsonl)
+
+- La extracción corre en procesos (pypdf / python-docx liberan poco el GIL).
+- La cola tiene tamaño fijo: si el embedder va más lento que la extracción,
+  se dejan de enviar archivos al pool y la memoria no crece.
+- Cada `checkpoint_every` documentos se escribe una parte y se actualiza
+  progress.json de forma atómica; una ingesta interrumpida retoma desde
+  ahí saltándose los archivos ya procesados.
+- Al terminar se reportan documentos/segundo y memoria pico.
+
+Uso:
+    python ingestion.py data/sentencias --workers 8 [--publish] [--corpus ID]
+
+Sin --publish, el servidor en modo local (RAG_SERVING_MODE=local) carga
+los documentos de data/ingest_checkpoint al arrancar.
+Con --publish, el Excel y los documentos ingeridos se publican como una
+versión nueva del índice compartido (index_store); los workers en modo
+shared la toman sin reiniciar. Con --publish --corpus, solo los documentos
+se publican como el corpus ID (data/corpora/ID, ver corpus_registry) y el
+checkpoint por defecto pasa a ser data/ingest_checkpoint/ID.
+"""
+
+import json
+import logging
+import os
+import queue
+import re
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+SUPPORTED_EXTENSIONS = {".pdf", ".docx", ".txt"}
+CHECKPOINT_DIR = "data/ingest_checkpoint"
+PROGRESS_FILE = "progress.json"
+
+BATCH_SIZE = 64
+QUEUE_SIZE = 256
+CHECKPOINT_EVERY = 512
+FIELD_CHARS = 2000  # tope de caracteres de resuelve / sintesis en los metadatos
+
+_PROVIDENCIA = re.compile(r"\b(?:Sentencia|Auto)\s+[A-Z]{1,3}\s?-\s?\d+[A-Z]?(?:\s+de\s+\d{4})?")
+_RESUELVE = re.compile(r"\bRESUELVE\b\s*:?")
+_SPACES = re.compile(r"[ \t]+")
+
+
+# ---------------------------------------------------------------------------
+# Extracción (se ejecuta en los procesos del pool)
+# ---------------------------------------------------------------------------
+def _read_pdf(path: str) -> str:
+    from pypdf import PdfReader
+
+    return "\n".join(page.extract_text() or "" for page in PdfReader(path).pages)
+
+
+def _read_docx(path: str) -> str:
+    from docx import Document
+
+    return "\n".join(p.text for p in Document(path).paragraphs)
+
+
+def _read_txt(path: str) -> str:
+    with open(path, "rb") as fh:
+        raw = fh.read()
+    try:
+        return raw.decode("utf-8-sig")
+    except UnicodeDecodeError:
+        return raw.decode("latin-1")
+
+
+READERS = {".pdf": _read_pdf, ".docx": _read_docx, ".txt": _read_txt}
+
+
+def extract_document(path: str) -> Dict:
+    """Extrae el texto de un archivo. Nunca lanza: los errores van en "error"."""
+    try:
+        text = READERS[os.path.splitext(path)[1].lower()](path)
+        text = _SPACES.sub(" ", text).strip()
+        if not text:
+            return {"path": path, "error": "sin texto extraíble (¿PDF escaneado?)"}
+        return {"path": path, "text": text}
+    except Exception as e:
+        return {"path": path, "error": f"{type(e).__name__}: {e}"}
+
+
+def case_from_text(rel_path: str, text: str) -> Tuple[str, Dict]:
+    """Texto para embedding y metadatos (mismas claves que process_excel_file)."""
+    match = _PROVIDENCIA.search(text)
+    providencia = match.group(0) if match else os.path.splitext(os.path.basename(rel_path))[0]
+
+    # La parte resolutiva suele venir después del último "RESUELVE"
+    resuelve_matches = list(_RESUELVE.finditer(text))
+    resuelve = text[resuelve_matches[-1].end():].strip()[:FIELD_CHARS] if resuelve_matches else "No especificada"
+    sintesis = text[:FIELD_CHARS]
+
+    metadata = {
+        "Relevancia": "No especificado",
+        "Providencia": providencia,
+        "Tipo": "No especificado",
+        "Fecha Sentencia": "No especificada",
+        "Tema_subtema": "No especificado",
+        "resuelve": resuelve,
+        "sintesis": sintesis,
+        "source": rel_path,
+    }
+    case_text = f"Documento legal: {providencia} | Resolución: {resuelve} | Resumen: {sintesis}"
+    return case_text, metadata
+
+
+# ---------------------------------------------------------------------------
+# Checkpoint
+# ---------------------------------------------------------------------------
+def _load_progress(checkpoint_dir: str, source_dir: str) -> Dict:
+    path = os.path.join(checkpoint_dir, PROGRESS_FILE)
+    if not os.path.exists(path):
+        return {"source_dir": source_dir, "done": [], "parts": 0, "documents": 0}
+    with open(path, encoding="utf-8") as fh:
+        progress = json.load(fh)
+    if progress["source_dir"] != source_dir:
+        raise ValueError(
+            f"El checkpoint {checkpoint_dir} es de {progress['source_dir']}, no de {source_dir}. "
+            "Usa otro --checkpoint o bórralo."
+        )
+    return progress
+
+
+def _write_part(checkpoint_dir: str, progress: Dict, embeddings: List[np.ndarray],
+                metadata: List[Dict], done: List[str]) -> None:
+    """Escribe una parte y luego actualiza progress.json (reemplazo atómico)."""
+    part = f"part-{progress['parts']:05d}"
+    np.save(os.path.join(checkpoint_dir, f"{part}.npy"), np.vstack(embeddings).astype("float32"))
+    with open(os.path.join(checkpoint_dir, f"{part}.jsonl"), "w", encoding="utf-8") as fh:
+        for item in metadata:
+            fh.write(json.dumps(item, ensure_ascii=False) + "\n")
+
+    progress["parts"] += 1
+    progress["documents"] += len(metadata)
+    progress["done"].extend(done)
+
+    tmp = os.path.join(checkpoint_dir, PROGRESS_FILE + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as fh:
+        json.dump(progress, fh, ensure_ascii=False)
+    os.replace(tmp, os.path.join(checkpoint_dir, PROGRESS_FILE))
+
+
+def load_checkpoint(checkpoint_dir: str = CHECKPOINT_DIR) -> Tuple[np.ndarray, List[Dict]]:
+    """Todas las partes confirmadas del checkpoint: (embeddings, metadatos)."""
+    with open(os.path.join(checkpoint_dir, PROGRESS_FILE), encoding="utf-8") as fh:
+        parts = json.load(fh)["parts"]
+
+    embeddings, metadata = [], []
+    for i in range(parts):
+        embeddings.append(np.load(os.path.join(checkpoint_dir, f"part-{i:05d}.npy")))
+        with open(os.path.join(checkpoint_dir, f"part-{i:05d}.jsonl"), encoding="utf-8") as fh:
+            metadata.extend(json.loads(line) for line in fh)
+
+    if not embeddings:
+        return np.empty((0, 384), dtype="float32"), []
+    return np.vstack(embeddings), metadata
+
+
+# ---------------------------------------------------------------------------
+# Ingesta
+# ---------------------------------------------------------------------------
+def scan_directory(source_dir: str) -> Iterator[str]:
+    """Rutas relativas de los archivos soportados, en orden estable."""
+    for root, dirs, files in os.walk(source_dir):
+        dirs.sort()
+        for name in sorted(files):
+            if os.path.splitext(name)[1].lower() in SUPPORTED_EXTENSIONS:
+                yield os.path.relpath(os.path.join(root, name), source_dir)
+
+
+def _peak_memory_mb() -> Dict[str, float]:
+    """Memoria pico (ru_maxrss) del proceso principal y del mayor proceso hijo."""
+    if resource is None:
+        return {}
+    scale = 1024 * 1024 if sys.platform == "darwin" else 1024  # bytes en macOS, KB en Linux
+    return {
+        "main": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale, 1),
+        "largest_worker": round(resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / scale, 1),
+    }
+
+
+def ingest_directory(
+    source_dir: str,
+    model,
+    checkpoint_dir: str = CHECKPOINT_DIR,
+    workers: Optional[int] = None,
+    batch_size: int = BATCH_SIZE,
+    queue_size: int = QUEUE_SIZE,
+    checkpoint_every: int = CHECKPOINT_EVERY,
+) -> Dict:
+    """
+    Extrae, embebe y guarda en checkpoint todos los documentos de source_dir.
+    `model` es cualquier objeto con encode(List[str]) (el SentenceTransformer
+    del pipeline, para no cargar una segunda copia).
+    Devuelve estadísticas de la ejecución. Si la extracción se interrumpe
+    (p. ej. un worker muere) lanza RuntimeError tras guardar el checkpoint
+    de lo ya procesado.
+    """
+    source_dir = os.path.abspath(source_dir)
+    os.makedirs(checkpoint_dir, exist_ok=True)
+    progress = _load_progress(checkpoint_dir, source_dir)
+    already_done = set(progress["done"])
+    pending = [p for p in scan_directory(source_dir) if p not in already_done]
+
+    logger.info(f" Ingesta: {len(pending)} archivos pendientes ({len(already_done)} ya procesados)")
+
+    docs: "queue.Queue[Optional[Dict]]" = queue.Queue(maxsize=queue_size)
+    failed: Dict[str, str] = {}
+    stop = threading.Event()
+    producer_errors: List[BaseException] = []
+
+    def produce(pool: ProcessPoolExecutor) -> None:
+        # Ventana deslizante de futuros: como mucho queue_size archivos en vuelo,
+        # y put() bloquea cuando la cola está llena (backpressure)
+        in_flight = deque()
+        try:
+            for rel_path in pending:
+                if stop.is_set():
+                    break
+                in_flight.append((rel_path, pool.submit(extract_document, os.path.join(source_dir, rel_path))))
+                if len(in_flight) >= queue_size:
+                    path, fut = in_flight.popleft()
+                    docs.put({**fut.result(), "rel_path": path})
+            while in_flight and not stop.is_set():
+                path, fut = in_flight.popleft()
+                docs.put({**fut.result(), "rel_path": path})
+        except BaseException as e:
+            # p. ej. BrokenProcessPool si un worker muere (OOM con un PDF dañado):
+            # se re-lanza en el hilo principal en lugar de terminar "con éxito"
+            producer_errors.append(e)
+        finally:
+            docs.put(None)
+
+    t0 = time.perf_counter()
+    embedded = 0
+    part_embeddings: List[np.ndarray] = []
+    part_metadata: List[Dict] = []
+    part_done: List[str] = []
+    batch: List[Tuple[str, str, Dict]] = []
+
+    def flush_batch() -> None:
+        nonlocal embedded
+        if not batch:
+            return
+        vectors = model.encode([text for _, text, _ in batch], batch_size=batch_size)
+        part_embeddings.append(np.asarray(vectors, dtype="float32"))
+        for rel_path, _, metadata in batch:
+            metadata["id"] = progress["documents"] + len(part_metadata) + 1
+            part_metadata.append(metadata)
+            part_done.append(rel_path)
+        embedded += len(batch)
+        batch.clear()
+
+    def checkpoint() -> None:
+        if part_metadata:
+            _write_part(checkpoint_dir, progress, part_embeddings, part_metadata, part_done)
+            part_embeddings.clear()
+            part_metadata.clear()
+            part_done.clear()
+            elapsed = time.perf_counter() - t0
+            logger.info(f" Checkpoint: {progress['documents']} documentos ({embedded / elapsed:.1f} docs/s)")
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        producer = threading.Thread(target=produce, args=(pool,), daemon=True)
+        producer.start()
+        try:
+            while True:
+                doc = docs.get()
+                if doc is None:
+                    break
+                if "error" in doc:
+                    failed[doc["rel_path"]] = doc["error"]
+                    logger.warning(f"No se pudo extraer {doc['rel_path']}: {doc['error']}")
+                    continue
+
+                case_text, metadata = case_from_text(doc["rel_path"], doc["text"])
+                batch.append((doc["rel_path"], case_text, metadata))
+                if len(batch) >= batch_size:
+                    flush_batch()
+                if len(part_metadata) >= checkpoint_every:
+                    checkpoint()
+
+            # Lo ya embebido se confirma antes de reportar un fallo del productor
+            flush_batch()
+            checkpoint()
+
+            if producer_errors:
+                unprocessed = len(pending) - embedded - len(failed)
+                raise RuntimeError(
+                    f"La extracción se interrumpió con {unprocessed} archivos sin procesar "
+                    f"({type(producer_errors[0]).__name__}: {producer_errors[0]}). "
+                    "Vuelve a ejecutar la ingesta para retomarla desde el checkpoint."
+                ) from producer_errors[0]
+        finally:
+            # Ante una interrupción, liberar al productor y no esperar el resto del pool
+            stop.set()
+            while producer.is_alive():
+                try:
+                    docs.get_nowait()
+                except queue.Empty:
+                    producer.join(timeout=0.1)
+            pool.shutdown(wait=True, cancel_futures=True)
+
+    elapsed = time.perf_counter() - t0
+    stats = {
+        "source_dir": source_dir,
+        "documents_ingested": embedded,
+        "documents_total": progress["documents"],
+        "skipped_already_done": len(already_done),
+        "failed": failed,
+        "seconds": round(elapsed, 2),
+        "docs_per_second": round(embedded / elapsed, 2) if elapsed > 0 else 0.0,
+        "peak_memory_mb": _peak_memory_mb(),
+    }
+    logger.info(
+        f" Ingesta terminada: {embedded} documentos en {elapsed:.1f}s "
+        f"({stats['docs_per_second']} docs/s), {len(failed)} fallidos, "
+        f"memoria pico {stats['peak_memory_mb']}"
+    )
+    return stats
+
+
+if __name__ == "__main__":
+    import argparse
+
+    logging.basicConfig(level=logging.INFO)
+
+    parser = argparse.ArgumentParser(description="Ingesta paralela de sentencias PDF/DOCX/TXT")
+    parser.add_argument("source_dir")
+    parser.add_argument("--checkpoint", default=None,
+                        help=f"Directorio de checkpoint (por defecto {CHECKPOINT_DIR}, o {CHECKPOINT_DIR}/<corpus> con --corpus)")
+    parser.add_argument("--workers", type=int, default=None, help="Procesos de extracción")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--queue-size", type=int, default=QUEUE_SIZE)
+    parser.add_argument("--publish", action="store_true",
+                        help="Publicar el resultado como nueva versión del índice compartido")
+
+    parser.add_argument("--data-file", default="data/sentencias_pasadas.xlsx",
+                        help="Excel que se incluye en el índice publicado junto a los documentos")
+    parser.add_argument("--corpus", default=None,
+                        help="Publicar como corpus independiente en data/corpora/<corpus> (requiere --publish)")
+    args = parser.parse_args()
+
+    if args.corpus is not None:
+        if not args.publish:
+            parser.error("--corpus requiere --publish")
+        from corpus_registry import corpus_dir
+        try:
+            corpus_dir(args.corpus)  # valida el id antes de la ingesta
+        except ValueError as e:
+            parser.error(str(e))
+    if args.checkpoint is None:
+        # Un checkpoint por corpus: si no, la ingesta de un corpus retomaría
+        # (o se saltaría) los documentos de otro
+        args.checkpoint = CHECKPOINT_DIR if args.corpus is None else os.path.join(CHECKPOINT_DIR, args.corpus)
+
+    from rag_pipeline import LegalRAGPipeline
+    from document_processor import DocumentProcessor
+
+    rag_pipeline = LegalRAGPipeline()
+    processor = DocumentProcessor(rag_pipeline)
+
+    if args.publish and args.corpus is None and os.path.exists(args.data_file):
+        processor.process_excel_file(args.data_file)
+
+    run_stats = processor.process_directory(
+        args.source_dir,
+        checkpoint_dir=args.checkpoint,
+        workers=args.workers,
+        batch_size=args.batch_size,
+        queue_size=args.queue_size,
+    )
+    print(json.dumps(run_stats, indent=2, ensure_ascii=False))
+
+    if not args.publish:
+        if os.path.abspath(args.checkpoint) == os.path.abspath(CHECKPOINT_DIR):
+            logger.warning(
+                f"Sin --publish: el servidor en modo local carga {CHECKPOINT_DIR} al arrancar; "
+                "en modo shared los documentos no se servirán hasta publicar con --publish"
+            )
+        else:
+            logger.warning(f"Sin --publish, los documentos de {args.checkpoint} no los servirá el servidor")
+
+    if args.publish:
+        from index_store import INDEX_DIR, build_lock, publish_index, source_fingerprint
+
+        source = None
+        if args.corpus is None:
+            index_dir = INDEX_DIR
+            if os.path.exists(args.data_file):
+                # Así el servidor no lo reconstruye mientras el Excel no cambie
+                source = source_fingerprint(args.data_file)
+        else:
+            index_dir = corpus_dir(args.corpus)
+
+        with build_lock(index_dir):
+            print(publish_index(*rag_pipeline.export_index(), index_dir, source=source))
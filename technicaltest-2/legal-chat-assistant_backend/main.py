@@ -1,7 +1,8 @@
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 import uvicorn
 import logging
 from datetime import datetime
@@ -22,6 +23,8 @@ sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 # Importar módulos RAG
 from rag_pipeline import LegalRAGPipeline
 from document_processor import DocumentProcessor
+from index_store import SharedIndex, build_lock, memory_usage, publish_index, published_source, source_fingerprint
+from corpus_registry import CorpusRegistry
 
 app = FastAPI(
     title="Legal AI Assistant API",
@@ -41,6 +44,17 @@ app.add_middleware(
 # Modelos Pydantic
 class QueryRequest(BaseModel):
     question: str
+    corpus: Optional[str] = None  # None = corpus principal (Excel)
+
+# Topes del servidor para /query/batch (los valores del cliente se recortan)
+MAX_BATCH_K = 20
+MAX_BATCH_CONCURRENCY = 16
+
+class BatchQueryRequest(BaseModel):
+    questions: List[str]
+    corpus: Optional[str] = None
+    k: int = 5
+    max_concurrency: int = 8
 
 class QueryResponse(BaseModel):
     answer: str
@@ -48,12 +62,23 @@ class QueryResponse(BaseModel):
     matched_cases: List[dict]
     timestamp: str
     total_cases_searched: int
+    prompt_tokens: int
     rag_used: bool
 
 # Inicializar RAG pipeline global
 rag_pipeline = None
 TOTAL_CASES = 0
 
+# Modo de servicio:
+# - "local":  cada proceso construye su propio índice (comportamiento original)
+# - "shared": el índice se construye una sola vez, se publica en data/index/
+#             y todos los workers lo leen por mmap (uvicorn main:app --workers N)
+SERVING_MODE = os.getenv("RAG_SERVING_MODE", "local")
+
+# Corpus adicionales (por jurisdicción / cliente) en data/corpora/<id>/,
+# cargados bajo demanda y compartiendo el modelo de rag_pipeline
+corpus_registry = CorpusRegistry()
+
 def initialize_rag_system():
     """Inicializa el sistema RAG con datos del Excel"""
     global rag_pipeline, TOTAL_CASES
@@ -76,9 +101,23 @@ def initialize_rag_system():
             create_sample_data(data_file)
         
         # 3. Procesar casos
-        TOTAL_CASES = processor.process_excel_file(data_file)
+        if SERVING_MODE == "shared":
+            # Solo el primer worker construye y publica; el resto espera el lock.
+            # También se reconstruye si el Excel cambió desde la versión publicada
+            with build_lock():
+                source = source_fingerprint(data_file)
+                if published_source() != source:
+                    processor.process_excel_file(data_file)
+                    processor.load_ingested()
+                    publish_index(*rag_pipeline.export_index(), source=source)
+            rag_pipeline.attach_shared_index(SharedIndex())
+            TOTAL_CASES = rag_pipeline.case_count
+        else:
+            TOTAL_CASES = processor.process_excel_file(data_file)
+            # Sentencias PDF/DOCX/TXT ingeridas con ingestion.py (sin --publish)
+            TOTAL_CASES += processor.load_ingested()
         
-        logger.info(f" Sistema RAG inicializado con {TOTAL_CASES} casos")
+        logger.info(f" Sistema RAG inicializado con {TOTAL_CASES} casos (modo {SERVING_MODE})")
         return True
         
     except Exception as e:
@@ -159,6 +198,7 @@ async def root():
         "endpoints": {
             "GET /health": "Verificar estado del sistema",
             "POST /query": "Consultar casos legales",
+            "POST /query/batch": "Consultar varias preguntas (respuesta NDJSON)",
             "GET /cases": "Listar casos disponibles",
             "GET /debug": "Información de diagnóstico",
             "GET /test": "Prueba de conectividad"
@@ -202,11 +242,51 @@ async def get_cases(limit: int = 10):
         ]
     }
 
+def resolve_corpus(corpus: Optional[str]):
+    """Devuelve (índice, total de casos) del corpus pedido; None = corpus principal"""
+    global TOTAL_CASES
+    if corpus is None:
+        TOTAL_CASES = rag_pipeline.case_count  # puede cambiar tras un hot-swap
+        return None, TOTAL_CASES
+    try:
+        index = corpus_registry.get(corpus)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Corpus no encontrado: {corpus}")
+    return index, index.ntotal
+
+def build_query_response(answer: str, similar_cases: List[dict], prompt_tokens: int = 0,
+                         total_cases: Optional[int] = None) -> Dict[str, Any]:
+    """Arma la respuesta de /query (también se usa por línea en /query/batch)"""
+    # Calcular confianza basada en similitud
+    confidence = 0.8
+    if similar_cases and len(similar_cases) > 0:
+        confidence = min(0.95, similar_cases[0].get("similarity_score", 0.7))
+    
+    return {
+        "answer": answer,
+        "confidence": confidence,
+        "matched_cases": [
+            {
+                "Tipo": case.get("Tipo", "Desconocido"),
+                "Tema": case.get("Tema_subtema", "No especificado"),
+                "Resumen": case.get("sintesis", "No especificado")[:150] + "...",
+                "Similaridad": f"{case.get('similarity_score', 0)*100:.1f}%"
+            }
+            for case in similar_cases[:3]  # Mostrar solo top 3
+        ],
+        "timestamp": datetime.now().isoformat(),
+        "total_cases_searched": TOTAL_CASES if total_cases is None else total_cases,
+        "prompt_tokens": prompt_tokens,
+        "rag_used": True
+    }
+
 @app.post("/query")
 async def query_legal_cases(request: QueryRequest):
     """Endpoint principal para consultas"""
     question = request.question
-    logger.info(f" Pregunta recibida: {question}")
+    logger.info(f" Pregunta recibida: {question} (corpus: {request.corpus or 'principal'})")
     
     try:
         if not rag_pipeline:
@@ -216,33 +296,14 @@ async def query_legal_cases(request: QueryRequest):
             )
         
         # 1. Buscar casos similares usando embeddings
-        similar_cases = rag_pipeline.search_similar_cases(question, k=5)
+        index, total_cases = resolve_corpus(request.corpus)
+        similar_cases = rag_pipeline.search_similar_cases(question, k=5, index=index)
         
         # 2. Generar respuesta usando RAG
-        answer = rag_pipeline.generate_answer(question, similar_cases)
+        answer, prompt_stats = rag_pipeline.generate_answer_with_stats(question, similar_cases)
         
-        # 3. Calcular confianza basada en similitud
-        confidence = 0.8
-        if similar_cases and len(similar_cases) > 0:
-            confidence = min(0.95, similar_cases[0].get("similarity_score", 0.7))
-        
-        # 4. Preparar respuesta
-        response = {
-            "answer": answer,
-            "confidence": confidence,
-            "matched_cases": [
-                {
-                    "Tipo": case.get("Tipo", "Desconocido"),
-                    "Tema": case.get("Tema_subtema", "No especificado"),
-                    "Resumen": case.get("sintesis", "No especificado")[:150] + "...",
-                    "Similaridad": f"{case.get('similarity_score', 0)*100:.1f}%"
-                }
-                for case in similar_cases[:3]  # Mostrar solo top 3
-            ],
-            "timestamp": datetime.now().isoformat(),
-            "total_cases_searched": TOTAL_CASES,
-            "rag_used": True
-        }
+        # 3. Preparar respuesta
+        response = build_query_response(answer, similar_cases, prompt_stats["prompt_tokens"], total_cases)
         
         logger.info(f" Pregunta procesada: {len(similar_cases)} casos encontrados")
         return response
@@ -253,6 +314,43 @@ async def query_legal_cases(request: QueryRequest):
         logger.error(f" Error en query: {e}")
         raise HTTPException(status_code=500, detail=f"Error interno: {str(e)}")
 
+@app.post("/query/batch")
+async def query_legal_cases_batch(request: BatchQueryRequest):
+    """
+    Consulta por lotes para evaluación y backfills.
+    Devuelve NDJSON: una línea por pregunta, en el orden de entrada, a medida
+    que se generan (la respuesta completa nunca se arma en memoria).
+    """
+    if not rag_pipeline:
+        raise HTTPException(
+            status_code=503,
+            detail="Sistema RAG no disponible. Intenta reiniciar el backend."
+        )
+    
+    logger.info(f" Lote recibido: {len(request.questions)} preguntas (corpus: {request.corpus or 'principal'})")
+    index, total_cases = resolve_corpus(request.corpus)
+    k = max(1, min(request.k, MAX_BATCH_K))
+    max_concurrency = max(1, min(request.max_concurrency, MAX_BATCH_CONCURRENCY))
+    
+    def stream():
+        results = rag_pipeline.answer_batch(
+            request.questions,
+            k=k,
+            max_concurrency=max_concurrency,
+            index=index,
+        )
+        for result in results:
+            line = {"index": result["index"], "question": result["question"]}
+            if "error" in result:
+                line["error"] = result["error"]
+            else:
+                line.update(build_query_response(result["answer"], result["cases"], result["prompt_tokens"], total_cases))
+            yield json.dumps(line, ensure_ascii=False) + "\n"
+        logger.info(f" Lote procesado: {len(request.questions)} preguntas")
+    
+    # Generador síncrono: Starlette lo itera en su threadpool sin bloquear el event loop
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
 @app.get("/debug")
 async def debug_info():
     """Endpoint para diagnóstico"""
@@ -265,6 +363,12 @@ async def debug_info():
         "rag_initialized": rag_pipeline is not None,
         "openai_available": rag_pipeline.openai_client is not None if rag_pipeline else False,
         "faiss_index_size": TOTAL_CASES,
+        "serving_mode": SERVING_MODE,
+        "index_version": rag_pipeline.shared_index.version if rag_pipeline and rag_pipeline.shared_index else None,
+        "worker_pid": os.getpid(),
+        "memory_mb": memory_usage(),
+        "corpora_available": corpus_registry.available(),
+        "corpora": corpus_registry.stats(),
         "timestamp": datetime.now().isoformat()
     }
 
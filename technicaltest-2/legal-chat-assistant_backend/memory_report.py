@@ -0,0 +1,81 @@
+"""
+Reporte de memoria por worker: diseño actual vs índice compartido.
+
+Lanza N procesos que imitan a N workers de uvicorn y mide la memoria de
+cada uno (VmRSS / RssAnon / RssFile de /proc, solo Linux):
+
+- local:  cada worker carga el modelo, re-embebe el Excel y guarda su
+          propio IndexFlatL2 + metadata_store (comportamiento original)
+- shared: cada worker carga el modelo y mapea el índice publicado en
+          data/index/ (las páginas RssFile se comparten entre procesos)
+
+Uso:
+    python memory_report.py --workers 4
+"""
+
+import argparse
+import multiprocessing as mp
+import os
+import time
+
+
+def _worker(mode: str, data_file: str, queue) -> None:
+    from rag_pipeline import LegalRAGPipeline
+    from document_processor import DocumentProcessor
+    from index_store import SharedIndex, memory_usage
+
+    t0 = time.perf_counter()
+    pipeline = LegalRAGPipeline()
+    if mode == "local":
+        DocumentProcessor(pipeline).process_excel_file(data_file)
+    else:
+        pipeline.attach_shared_index(SharedIndex())
+
+    # Una consulta para tocar todas las páginas del índice
+    pipeline.search_similar_cases("acoso escolar", k=5)
+
+    queue.put({
+        "mode": mode,
+        "pid": os.getpid(),
+        "startup_s": round(time.perf_counter() - t0, 2),
+        "cases": pipeline.case_count,
+        **memory_usage(),
+    })
+
+
+def _run(mode: str, workers: int, data_file: str) -> list:
+    ctx = mp.get_context("spawn")  # igual que uvicorn --workers
+    queue = ctx.Queue()
+    procs = [ctx.Process(target=_worker, args=(mode, data_file, queue)) for _ in range(workers)]
+    for p in procs:
+        p.start()
+    rows = [queue.get() for _ in procs]
+    for p in procs:
+        p.join()
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--data-file", default="data/sentencias_pasadas.xlsx")
+    args = parser.parse_args()
+
+    from index_store import build_and_publish, build_lock, current_version
+
+    with build_lock():
+        if current_version() is None:
+            build_and_publish(args.data_file)
+
+    print(f"{'modo':<7} {'pid':>7} {'arranque':>9} {'casos':>6} {'RSS':>8} {'anon':>8} {'file':>8}  (MB)")
+    for mode in ["local", "shared"]:
+        rows = _run(mode, args.workers, args.data_file)
+        for r in rows:
+            print(f"{r['mode']:<7} {r['pid']:>7} {r['startup_s']:>8}s {r['cases']:>6} "
+                  f"{r.get('rss', 0):>8} {r.get('rss_anon', 0):>8} {r.get('rss_file', 0):>8}")
+        # La memoria privada se suma por worker; la mapeada del índice se comparte
+        print(f"{mode:<7} total privado (RssAnon): {sum(r.get('rss_anon', 0) for r in rows):.1f} MB\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -4,11 +4,18 @@ from sentence_transformers import SentenceTransformer
 from openai import OpenAI
 import os
 import logging
-from typing import List, Dict, Any
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Iterator, Tuple
+from context_builder import ContextBuilder, SYSTEM_PROMPT
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Respuestas recordadas entre bloques de answer_batch para deduplicar
+DEDUP_CACHE_SIZE = 256
+
 class LegalRAGPipeline:
     def __init__(self):
         # Usar modelo de embeddings más pequeño y eficiente
@@ -19,6 +26,14 @@ class LegalRAGPipeline:
         self.index = faiss.IndexFlatL2(self.dimension)
         self.metadata_store = {}
         
+        # Índice compartido entre workers (ver index_store.SharedIndex)
+        self.shared_index = None
+        
+        # Armado del prompt con presupuesto de tokens (ver context_builder).
+        # Se crea al primer prompt: cargar el tokenizador puede requerir red
+        self._context_builder = None
+        self._context_builder_lock = threading.Lock()
+        
         # Configurar OpenAI
         api_key = os.getenv("OPENAI_API_KEY")
         if not api_key:
@@ -41,80 +56,199 @@ class LegalRAGPipeline:
             **metadata
         }
     
-    def search_similar_cases(self, query: str, k: int = 5) -> List[Dict]:
+    def add_embeddings(self, embeddings: np.ndarray, metadata: List[Dict]):
+        """Agrega casos ya embebidos (p. ej. desde un checkpoint de ingesta)"""
+        if len(embeddings) == 0:
+            return
+        
+        start = len(self.metadata_store)
+        self.index.add(np.ascontiguousarray(embeddings, dtype="float32"))
+        for offset, item in enumerate(metadata):
+            self.metadata_store[start + offset] = item
+    
+    def attach_shared_index(self, shared_index):
+        """Usa un índice publicado (mmap, solo lectura) y libera el índice local"""
+        self.shared_index = shared_index
+        self.index = None
+        self.metadata_store = {}
+    
+    def export_index(self):
+        """Devuelve (embeddings, metadatos) del índice local para publicarlo"""
+        embeddings = self.index.reconstruct_n(0, self.index.ntotal)
+        metadata = [self.metadata_store[i] for i in range(self.index.ntotal)]
+        return embeddings, metadata
+    
+    @property
+    def context_builder(self) -> ContextBuilder:
+        if self._context_builder is None:
+            with self._context_builder_lock:
+                if self._context_builder is None:
+                    self._context_builder = ContextBuilder()
+        return self._context_builder
+    
+    @property
+    def case_count(self) -> int:
+        if self.shared_index is not None:
+            return self.shared_index.ntotal
+        return self.index.ntotal
+    
+    def search_similar_cases(self, query: str, k: int = 5, index=None) -> List[Dict]:
         """Busca casos similares usando embeddings"""
         try:
-            query_embedding = self.model.encode([query]).astype("float32")
-            distances, indices = self.index.search(query_embedding, k)
-            
-            results = []
-            for idx, distance in zip(indices[0], distances[0]):
-                if idx != -1 and idx in self.metadata_store:
-                    case = self.metadata_store[idx].copy()
-                    case["similarity_score"] = float(1 / (1 + distance))
-                    results.append(case)
-            
-            return results
+            return self.search_many([query], k, index)[0]
         except Exception as e:
             logger.error(f"Error en búsqueda: {e}")
             return []
     
+    def search_many(self, queries: List[str], k: int = 5, index=None) -> List[List[Dict]]:
+        """
+        Busca casos similares para varias consultas a la vez:
+        un solo encode por lotes y una sola búsqueda FAISS con la matriz de consultas.
+        `index` permite consultar otro corpus (SharedIndex) con el mismo modelo.
+        """
+        if not queries:
+            return []
+        
+        query_embeddings = self.model.encode(list(queries), batch_size=64).astype("float32")
+        
+        shared_index = index if index is not None else self.shared_index
+        if shared_index is not None:
+            # Hot-swap: cambia a la última versión publicada si la hay
+            shared_index.refresh()
+            # Los ids se resuelven con la misma versión que hizo la búsqueda
+            distances, indices, store = shared_index.search(query_embeddings, k)
+            lookup = store.get
+        else:
+            store = self.metadata_store
+            distances, indices = self.index.search(query_embeddings, k)
+            lookup = store.__getitem__
+        
+        all_results = []
+        for row_indices, row_distances in zip(indices, distances):
+            results = []
+            for idx, distance in zip(row_indices, row_distances):
+                if idx != -1 and idx in store:
+                    case = dict(lookup(int(idx)))
+                    case["similarity_score"] = float(1 / (1 + distance))
+                    results.append(case)
+            all_results.append(results)
+        
+        return all_results
+    
+    def answer_batch(
+        self,
+        questions: List[str],
+        k: int = 5,
+        max_concurrency: int = 8,
+        chunk_size: int = 64,
+        index=None,
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Responde una lista de preguntas y va entregando un resultado por pregunta
+        (en el orden de entrada) a medida que cada bloque termina:
+        - las preguntas se procesan en bloques de chunk_size (memoria acotada)
+        - cada bloque se embebe y se busca en una sola pasada (search_many)
+        - la generación corre en un pool de max_concurrency hilos
+        - preguntas idénticas (ignorando espacios y mayúsculas) se resuelven una
+          sola vez dentro del bloque, y entre bloques mientras sigan en un LRU
+          de DEDUP_CACHE_SIZE respuestas
+        Si la búsqueda o la generación fallan, el resultado lleva "error" en
+        lugar de "answer".
+        """
+        cache: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        
+        with ThreadPoolExecutor(max_workers=max(1, max_concurrency)) as pool:
+            for start in range(0, len(questions), chunk_size):
+                chunk = questions[start:start + chunk_size]
+                
+                resolved: Dict[str, Dict[str, Any]] = {}
+                pending: Dict[str, str] = {}
+                for question in chunk:
+                    key = self._question_key(question)
+                    if key in resolved or key in pending:
+                        continue
+                    if key in cache:
+                        cache.move_to_end(key)
+                        resolved[key] = cache[key]
+                    else:
+                        pending[key] = question
+                
+                if pending:
+                    try:
+                        cases_per_question = self.search_many(list(pending.values()), k, index)
+                    except Exception as e:
+                        # Sin casos no hay respuesta válida: se reporta el error, no "no encontré casos"
+                        logger.error(f"Error en búsqueda por lotes: {e}")
+                        for key in pending:
+                            resolved[key] = {"cases": [], "error": f"Error en búsqueda: {e}"}
+                        pending = {}
+                        cases_per_question = []
+                    
+                    futures = {
+                        key: (cases, pool.submit(self.generate_answer_with_stats, question, cases))
+                        for (key, question), cases in zip(pending.items(), cases_per_question)
+                    }
+                    for key, (cases, future) in futures.items():
+                        try:
+                            answer, stats = future.result()
+                        except Exception as e:
+                            logger.error(f"Error generando respuesta: {e}")
+                            resolved[key] = {"cases": cases, "error": str(e)}
+                            continue
+                        resolved[key] = {"cases": cases, "answer": answer, "prompt_tokens": stats["prompt_tokens"]}
+                        cache[key] = resolved[key]
+                        if len(cache) > DEDUP_CACHE_SIZE:
+                            cache.popitem(last=False)
+                
+                for offset, question in enumerate(chunk):
+                    yield {"index": start + offset, "question": question, **resolved[self._question_key(question)]}
+    
+    @staticmethod
+    def _question_key(question: str) -> str:
+        return " ".join(question.lower().split())
+    
     def generate_answer(self, question: str, relevant_cases: List[Dict]) -> str:
         """Genera respuesta usando GPT o fallback"""
+        return self.generate_answer_with_stats(question, relevant_cases)[0]
+    
+    def generate_answer_with_stats(self, question: str, relevant_cases: List[Dict]) -> Tuple[str, Dict]:
+        """Igual que generate_answer, pero devuelve también las estadísticas del prompt"""
         
         if not relevant_cases:
-            return "No encontré casos relevantes en la base de datos. ¿Podrías reformular tu pregunta?"
-        
-        # Construir contexto con los casos relevantes
-        context = "\n\n".join([
-            f"Caso #{i+1}:\n"
-            f"- Tipo: {case.get('Tipo', 'No especificado')}\n"
-            f"- Tema: {case.get('Tema_subtema', 'No especificado')}\n"
-            f"- Resolución: {case.get('resuelve', 'No especificada')}\n"
-            f"- Resumen: {case.get('sintesis', 'No especificada')}"
-            for i, case in enumerate(relevant_cases[:3])  # Usar máximo 3 casos
-        ])
-        
-        # Si no hay OpenAI, usar respuesta simple
+            return "No encontré casos relevantes en la base de datos. ¿Podrías reformular tu pregunta?", {"prompt_tokens": 0}
+        
+        # Si no hay OpenAI, usar respuesta simple (no se arma ningún prompt)
         if not self.openai_client:
-            return self._generate_simple_answer(question, relevant_cases)
+            return self._generate_simple_answer(question, relevant_cases), {"prompt_tokens": 0}
+        
+        # Construir el prompt con los casos más relevantes dentro del presupuesto de tokens
+        prompt, stats = self.context_builder.build(question, relevant_cases)
+        if stats["over_budget"]:
+            logger.warning(f"Prompt de {stats['prompt_tokens']} tokens supera el presupuesto de {stats['token_budget']}")
         
         # Usar GPT para generar respuesta coloquial
         try:
-            prompt = f"""
-Eres un asistente legal que explica casos legales en lenguaje sencillo para personas sin conocimientos de derecho.
-
-CONTEXTO (casos legales reales):
-{context}
-
-PREGUNTA DEL USUARIO:
-{question}
-
-INSTRUCCIONES:
-1. Responde EN ESPAÑOL y en lenguaje coloquial
-2. Usa solo la información del contexto (NO inventes nada)
-3. Sé claro y conciso
-4. Si hay múltiples casos, menciona los más relevantes
-5. Explica qué pasó y cuál fue el resultado
-
-RESPUESTA:
-"""
-            
             response = self.openai_client.chat.completions.create(
                 model="gpt-4o-mini",
                 messages=[
-                    {"role": "system", "content": "Eres un asistente legal amigable que explica casos legales en términos simples."},
+                    {"role": "system", "content": SYSTEM_PROMPT},
                     {"role": "user", "content": prompt}
                 ],
                 temperature=0.3,
                 max_tokens=500
             )
             
-            return response.choices[0].message.content
+            if getattr(response, "usage", None) is not None:
+                stats["prompt_tokens_api"] = response.usage.prompt_tokens
+            logger.info(
+                f" Prompt: {stats['prompt_tokens']} tokens (API: {stats.get('prompt_tokens_api', '-')}), "
+                f"{stats['cases_used']} casos"
+            )
+            return response.choices[0].message.content, stats
             
         except Exception as e:
             logger.error(f"Error con OpenAI: {e}")
-            return self._generate_simple_answer(question, relevant_cases)
+            return self._generate_simple_answer(question, relevant_cases), stats
     
     def _generate_simple_answer(self, question: str, cases: List[Dict]) -> str:
         """Genera respuesta simple sin OpenAI"""
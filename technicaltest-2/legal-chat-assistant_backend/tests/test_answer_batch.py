@@ -0,0 +1,86 @@
+import sys
+from pathlib import Path
+
+# Añadir la raíz del backend al PATH
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path.append(str(ROOT_DIR))
+
+import numpy as np
+import pytest
+
+pytest.importorskip("sentence_transformers")
+pytest.importorskip("openai")
+import rag_pipeline
+from rag_pipeline import LegalRAGPipeline
+
+
+class _FakeModel:
+    def encode(self, texts, batch_size=None):
+        return np.stack([
+            np.random.default_rng(sum(map(ord, text))).random(384, dtype="float32") for text in texts
+        ])
+
+
+@pytest.fixture
+def pipeline(monkeypatch):
+    monkeypatch.setattr(rag_pipeline, "SentenceTransformer", lambda name: _FakeModel())
+    monkeypatch.delenv("OPENAI_API_KEY", raising=False)
+    pipeline = LegalRAGPipeline()
+    pipeline.add_embeddings(
+        np.random.default_rng(0).random((10, 384), dtype="float32"),
+        [{"Providencia": f"T-{i}", "resuelve": "Ampara", "sintesis": "Caso"} for i in range(10)],
+    )
+    return pipeline
+
+
+def _count_generations(monkeypatch, pipeline):
+    calls = []
+    generate = pipeline.generate_answer_with_stats
+
+    def counting(question, cases):
+        calls.append(question)
+        return generate(question, cases)
+
+    monkeypatch.setattr(pipeline, "generate_answer_with_stats", counting)
+    return calls
+
+
+def test_results_keep_input_order_and_dedup_across_chunks(pipeline, monkeypatch):
+    calls = _count_generations(monkeypatch, pipeline)
+    questions = ["Acoso escolar", "despido", "  acoso  ESCOLAR ", "tutela", "Despido", "acoso escolar"]
+
+    results = list(pipeline.answer_batch(questions, k=3, chunk_size=2))
+
+    assert [r["index"] for r in results] == list(range(len(questions)))
+    assert [r["question"] for r in results] == questions
+    assert all("answer" in r and len(r["cases"]) == 3 for r in results)
+    # Una generación por pregunta normalizada distinta, dentro y entre bloques
+    assert sorted(pipeline._question_key(q) for q in calls) == ["acoso escolar", "despido", "tutela"]
+    assert results[0]["answer"] == results[2]["answer"] == results[5]["answer"]
+
+
+def test_search_failure_yields_error_lines(pipeline, monkeypatch):
+    calls = _count_generations(monkeypatch, pipeline)
+
+    def failing_search(queries, k=5, index=None):
+        raise RuntimeError("índice no disponible")
+
+    monkeypatch.setattr(pipeline, "search_many", failing_search)
+
+    results = list(pipeline.answer_batch(["a", "b", "a"], chunk_size=2))
+
+    assert [r["index"] for r in results] == [0, 1, 2]
+    assert all("answer" not in r and "índice no disponible" in r["error"] for r in results)
+    assert calls == []
+
+
+def test_tokenizer_is_not_loaded_without_openai(pipeline, monkeypatch):
+    def no_builder(*args, **kwargs):
+        raise AssertionError("ContextBuilder no debe crearse sin OpenAI")
+
+    monkeypatch.setattr(rag_pipeline, "ContextBuilder", no_builder)
+    cases = pipeline.search_many(["acoso escolar"])[0]
+
+    answer, stats = LegalRAGPipeline().generate_answer_with_stats("acoso escolar", cases)
+
+    assert answer and stats == {"prompt_tokens": 0}
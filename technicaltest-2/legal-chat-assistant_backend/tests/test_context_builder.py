@@ -0,0 +1,73 @@
+import sys
+from pathlib import Path
+
+# Añadir la raíz del backend al PATH
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path.append(str(ROOT_DIR))
+
+from context_builder import ELLIPSIS, ContextBuilder, _ApproxEncoding
+
+def _builder(budget):
+    return ContextBuilder(token_budget=budget, encoding=_ApproxEncoding())
+
+def _case(providencia, score, text="La Corte amparó los derechos del menor.", tipo="Acoso"):
+    return {"Providencia": providencia, "Tipo": tipo, "Tema_subtema": "Educación",
+            "resuelve": text, "sintesis": text, "similarity_score": score}
+
+def test_packs_highest_scores_within_budget():
+    builder = _builder(600)
+    long_text = "La Corte decidió amparar los derechos del menor. " * 80
+    cases = [
+        _case("T-1", 0.2, "Caso poco relevante sobre PIAR.", tipo="PIAR"),
+        _case("T-2", 0.9, long_text),
+        _case("T-3", 0.5, "Difamación en Facebook con multa.", tipo="Difamación"),
+    ]
+
+    prompt, stats = builder.build("¿acoso escolar?", cases)
+
+    assert stats["prompt_tokens"] <= 600
+    assert not stats["over_budget"]
+    assert stats["cases_used"] >= 1
+    # El caso de mayor similitud va primero aunque venga último en la lista
+    assert "Caso #1:\n- Tipo: Acoso" in prompt
+
+def test_truncate_cuts_at_sentence_boundary():
+    builder = _builder(1500)
+    text = "Primera oración completa. Segunda oración que es bastante más larga que la primera."
+
+    cut = builder.truncate(text, 8)
+
+    assert cut == "Primera oración completa." + ELLIPSIS
+    assert builder.truncate(text, 1000) == text
+
+def test_skips_near_duplicate_cases():
+    builder = _builder(1500)
+    cases = [_case("T-1", 0.9), _case("T-1", 0.8), _case("T-9", 0.7), _case("T-5", 0.6, "Otro tema distinto.", "PIAR")]
+
+    _, stats = builder.build("¿acoso?", cases)
+
+    # T-1 repetido (misma providencia) y T-9 (mismo texto) se omiten
+    assert stats["duplicates_skipped"] == 2
+    assert stats["cases_used"] == 2
+
+def test_long_question_is_truncated_to_fit_budget():
+    builder = _builder(300)
+    question = "¿Qué pasó en el caso de acoso escolar en el colegio? " * 40
+
+    prompt, stats = builder.build(question, [_case("T-1", 0.9)])
+
+    assert stats["question_truncated"]
+    assert stats["prompt_tokens"] <= 300
+    assert not stats["over_budget"]
+
+def test_loads_encoding_from_local_file(tmp_path):
+    import base64
+    from context_builder import load_encoding
+
+    path = tmp_path / "o200k_base.tiktoken"
+    path.write_text("".join(f"{base64.b64encode(bytes([b])).decode()} {b}\n" for b in range(256)))
+
+    encoding = load_encoding(str(path))
+
+    assert not isinstance(encoding, _ApproxEncoding)
+    assert encoding.decode(encoding.encode("¿Qué resolvió la Corte?")) == "¿Qué resolvió la Corte?"
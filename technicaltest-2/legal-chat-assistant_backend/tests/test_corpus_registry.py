@@ -0,0 +1,78 @@
+import sys
+from pathlib import Path
+
+# Añadir la raíz del backend al PATH
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path.append(str(ROOT_DIR))
+
+import numpy as np
+import pytest
+from corpus_registry import CorpusRegistry, _footprint_mb
+from index_store import publish_index
+
+def _publish_corpora(corpora_dir, names):
+    for i, name in enumerate(names):
+        embeddings = np.random.default_rng(i).random((40, 384), dtype="float32")
+        publish_index(embeddings, [{"id": j, "corpus": name} for j in range(40)], str(corpora_dir / name))
+
+def _corpus_mb(corpora_dir):
+    return _footprint_mb(CorpusRegistry(str(corpora_dir)).get("a"))
+
+def test_evicts_least_recently_used_corpus(tmp_path):
+    _publish_corpora(tmp_path, ["a", "b", "c"])
+    registry = CorpusRegistry(str(tmp_path), memory_budget_mb=2.5 * _corpus_mb(tmp_path))
+    assert registry.available() == ["a", "b", "c"]
+
+    a = registry.get("a")
+    registry.get("b")
+    assert registry.get("a") is a  # a pasa a ser el más reciente
+    registry.get("c")
+
+    stats = registry.stats()
+    assert stats["hot"] == ["a", "c"]
+    assert stats["memory_used_mb"] <= registry.memory_budget_mb
+    assert stats["corpora"]["a"]["loads"] == 1 and stats["corpora"]["a"]["hits"] == 1
+    assert stats["corpora"]["b"]["evictions"] == 1 and not stats["corpora"]["b"]["loaded"]
+
+    # Un corpus desalojado se vuelve a cargar al consultarlo
+    registry.get("b")
+    stats = registry.stats()
+    assert stats["hot"] == ["c", "b"]
+    assert stats["corpora"]["b"]["loads"] == 2
+    assert stats["corpora"]["a"]["evictions"] == 1
+
+def test_never_evicts_the_corpus_just_loaded(tmp_path):
+    _publish_corpora(tmp_path, ["a", "b"])
+    registry = CorpusRegistry(str(tmp_path), memory_budget_mb=0.5 * _corpus_mb(tmp_path))
+
+    registry.get("a")
+    b = registry.get("b")
+
+    stats = registry.stats()
+    assert stats["hot"] == ["b"]
+    assert stats["corpora"]["a"]["evictions"] == 1
+    assert stats["corpora"]["b"]["evictions"] == 0
+    assert b.ntotal == 40
+
+def test_unknown_and_invalid_corpus_ids(tmp_path):
+    _publish_corpora(tmp_path, ["a"])
+    registry = CorpusRegistry(str(tmp_path))
+
+    with pytest.raises(KeyError):
+        registry.get("desconocido")
+    with pytest.raises(ValueError):
+        registry.get("../x")
+    assert registry.stats()["corpora"] == {}
+
+def test_concurrent_first_queries_load_once(tmp_path):
+    from concurrent.futures import ThreadPoolExecutor
+
+    _publish_corpora(tmp_path, ["a"])
+    registry = CorpusRegistry(str(tmp_path))
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        indexes = list(pool.map(lambda _: registry.get("a"), range(16)))
+
+    assert all(index is indexes[0] for index in indexes)
+    stats = registry.stats()["corpora"]["a"]
+    assert stats["loads"] == 1 and stats["hits"] == 15
@@ -0,0 +1,42 @@
+import sys
+from pathlib import Path
+
+# Añadir la raíz del backend al PATH
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path.append(str(ROOT_DIR))
+
+import numpy as np
+import pytest
+
+pytest.importorskip("sentence_transformers")
+pytest.importorskip("openai")
+import rag_pipeline
+from document_processor import DocumentProcessor
+from ingestion import ingest_directory
+
+
+class _FakeModel:
+    def encode(self, texts, batch_size=None):
+        return np.ones((len(texts), 384), dtype="float32")
+
+
+def test_load_ingested_serves_checkpointed_documents(tmp_path, monkeypatch):
+    monkeypatch.setattr(rag_pipeline, "SentenceTransformer", lambda name: _FakeModel())
+    monkeypatch.delenv("OPENAI_API_KEY", raising=False)
+
+    source = tmp_path / "docs"
+    source.mkdir()
+    for name in ("a.txt", "b.txt"):
+        (source / name).write_text("Sentencia T-001 de 2020", encoding="utf-8")
+    checkpoint_dir = str(tmp_path / "ckpt")
+    ingest_directory(str(source), _FakeModel(), checkpoint_dir=checkpoint_dir, workers=1)
+
+    # Servidor recién arrancado: un caso del Excel y luego el checkpoint
+    pipeline = rag_pipeline.LegalRAGPipeline()
+    pipeline.add_case("Caso del Excel", {"id": 1})
+    processor = DocumentProcessor(pipeline)
+
+    assert processor.load_ingested(checkpoint_dir) == 2
+    assert pipeline.case_count == 3
+    assert [pipeline.metadata_store[i]["id"] for i in range(3)] == [1, 2, 3]
+    assert processor.load_ingested(str(tmp_path / "sin_checkpoint")) == 0
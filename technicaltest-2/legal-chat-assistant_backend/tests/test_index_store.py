@@ -0,0 +1,44 @@
+import sys
+from pathlib import Path
+
+# Añadir la raíz del backend al PATH
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path.append(str(ROOT_DIR))
+
+import numpy as np
+from index_store import SharedIndex, publish_index
+
+def test_results_resolve_against_the_version_that_searched(tmp_path):
+    rng = np.random.default_rng(0)
+    v1 = rng.random((20, 384), dtype="float32")
+    publish_index(v1, [{"id": i, "version": 1} for i in range(20)], str(tmp_path))
+
+    shared = SharedIndex(str(tmp_path))
+    distances, indices, snapshot = shared.search(v1[15:16], 3)
+
+    # Se publica una versión más pequeña entre search y get
+    publish_index(v1[:5], [{"id": i, "version": 2} for i in range(5)], str(tmp_path))
+    assert shared.refresh(force=True)
+    assert shared.ntotal == 5
+
+    assert indices[0][0] == 15
+    for idx in indices[0]:
+        assert idx in snapshot
+        assert snapshot.get(int(idx)) == {"id": int(idx), "version": 1}
+
+
+def test_published_source_tracks_the_excel(tmp_path):
+    from index_store import published_source, source_fingerprint
+
+    data_file = tmp_path / "sentencias.xlsx"
+    data_file.write_bytes(b"v1")
+    index_dir = str(tmp_path / "index")
+    assert published_source(index_dir) is None
+
+    publish_index(np.zeros((1, 4), dtype="float32"), [{"id": 1}], index_dir,
+                  source=source_fingerprint(str(data_file)))
+    assert published_source(index_dir) == source_fingerprint(str(data_file))
+
+    # Excel editado: la huella publicada deja de coincidir
+    data_file.write_bytes(b"version 2")
+    assert published_source(index_dir) != source_fingerprint(str(data_file))
@@ -0,0 +1,40 @@
+import os
+import sys
+from pathlib import Path
+
+# Añadir la raíz del backend al PATH
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path.append(str(ROOT_DIR))
+
+import numpy as np
+import pytest
+import ingestion
+
+
+class _FakeModel:
+    def encode(self, texts, batch_size=None):
+        return np.zeros((len(texts), 4), dtype="float32")
+
+
+def _extract_or_crash(path):
+    # Simula un worker que el sistema mata (OOM) al abrir un PDF dañado
+    if path.endswith("roto.txt"):
+        os._exit(1)
+    return {"text": Path(path).read_text(encoding="utf-8")}
+
+
+def test_worker_crash_fails_the_ingest_and_keeps_the_checkpoint(tmp_path, monkeypatch):
+    source = tmp_path / "docs"
+    source.mkdir()
+    (source / "a.txt").write_text("Sentencia T-001 de 2020", encoding="utf-8")
+    for name in ("b_roto.txt", "c.txt", "d.txt"):
+        (source / name).write_text("texto", encoding="utf-8")
+    monkeypatch.setattr(ingestion, "extract_document", _extract_or_crash)
+
+    checkpoint_dir = str(tmp_path / "ckpt")
+    with pytest.raises(RuntimeError, match="sin procesar"):
+        ingestion.ingest_directory(str(source), _FakeModel(), checkpoint_dir=checkpoint_dir,
+                                   workers=1, queue_size=1, batch_size=1)
+
+    _, metadata = ingestion.load_checkpoint(checkpoint_dir)
+    assert [m["source"] for m in metadata] == ["a.txt"]